@@ -9,11 +9,16 @@ Orchestrates the complete decision trace construction process:
 5. Detect policy exceptions
 6. Construct immutable DecisionTrace
 """
+import os
 import asyncio
 import uuid
 import logging
+from bisect import bisect_left, insort
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, Union
+
+from dateutil import parser as date_parser
 
 from .models import (
     DecisionTrace,
@@ -27,13 +32,42 @@ from .models import (
     EmailIngestionRequest,
 )
 from .gmail_service import gmail_service
-from .gemini_service import gemini_service, extract_decision_from_email
+from .gemini_service import (
+    gemini_service,
+    extract_decision_from_email,
+    extract_decisions_from_emails,
+)
 from .policy_store import policy_store
+from .decision_rules import build_evidence, detect_policy_exceptions, is_low_signal_email
 from .mock_apis import get_all_customer_data
 from .graph_operations import find_precedents, find_semantic_precedents
 
 logger = logging.getLogger(__name__)
 
+# Maximum decision traces kept in the in-memory store (least recently used evicted)
+MAX_CACHED_DECISIONS = int(os.getenv("MAX_CACHED_DECISIONS", "10000"))
+
+
+# Extracted outcome string -> DecisionOutcome
+_OUTCOME_MAP: Dict[str, DecisionOutcome] = {
+    "approved": DecisionOutcome.APPROVED,
+    "rejected": DecisionOutcome.REJECTED,
+    "modified": DecisionOutcome.MODIFIED,
+    "escalated": DecisionOutcome.ESCALATED,
+    "pending": DecisionOutcome.PENDING,
+}
+
+# Extraction used when the pre-filter skips the LLM - left pending for review
+_PREFILTER_EXTRACTION: Dict[str, Any] = {
+    "outcome": "pending",
+    "reasoning": "pre-filter: low-signal email",
+}
+
+
+def _parse_outcome(outcome_str: str) -> DecisionOutcome:
+    """Map an extracted outcome string to a DecisionOutcome (PENDING if unknown)."""
+    return _OUTCOME_MAP.get(outcome_str.lower(), DecisionOutcome.PENDING)
+
 
 class DecisionEngine:
     """
@@ -45,9 +79,43 @@ class DecisionEngine:
     
     def __init__(self):
         """Initialize decision engine."""
-        self._decisions: Dict[str, DecisionTrace] = {}
+        self._decisions: "OrderedDict[str, DecisionTrace]" = OrderedDict()
+        # (timestamp, decision_id) kept sorted ascending, overall and per customer
+        self._by_time: List[Tuple[datetime, str]] = []
+        self._by_customer: Dict[str, List[Tuple[datetime, str]]] = {}
         logger.info("DecisionEngine initialized")
     
+    def _store_decision(self, decision_trace: DecisionTrace) -> None:
+        """Add a trace to the in-memory store, evicting the least recently used beyond the cap."""
+        decision_id = decision_trace.decision_id
+        if decision_id in self._decisions:
+            self._forget_decision(decision_id)
+        
+        self._decisions[decision_id] = decision_trace
+        entry = (decision_trace.timestamp, decision_id)
+        insort(self._by_time, entry)
+        insort(
+            self._by_customer.setdefault(decision_trace.request.customer.lower(), []),
+            entry
+        )
+        
+        while len(self._decisions) > MAX_CACHED_DECISIONS:
+            self._forget_decision(next(iter(self._decisions)))
+    
+    def _forget_decision(self, decision_id: str) -> None:
+        """Remove a trace from the in-memory store and its time indexes."""
+        decision_trace = self._decisions.pop(decision_id)
+        entry = (decision_trace.timestamp, decision_id)
+        customer_key = decision_trace.request.customer.lower()
+        
+        for index in (self._by_time, self._by_customer[customer_key]):
+            pos = bisect_left(index, entry)
+            if pos < len(index) and index[pos] == entry:
+                del index[pos]
+        
+        if not self._by_customer[customer_key]:
+            del self._by_customer[customer_key]
+    
     async def construct_decision_trace(
         self,
         request: EmailIngestionRequest
@@ -67,40 +135,178 @@ class DecisionEngine:
         logger.info(f"Starting decision trace construction for {request.customer_name}")
         
         # Step 1: Get email text
+        email_text, source = await self._resolve_email_text(request)
+        
+        return await self._finalize_trace(request, email_text, source)
+    
+    async def construct_decision_traces(
+        self,
+        requests: List[EmailIngestionRequest]
+    ) -> List[Union[DecisionTrace, Exception]]:
+        """
+        Construct decision traces for multiple ingestion requests.
+        
+        Gmail messages and threads referenced by the requests are
+        prefetched in batched API calls, LLM extraction for all threads is packed into
+        as few Gemini prompts as possible, then enrichment and the rest
+        of each trace run concurrently.
+        
+        Args:
+            requests: List of EmailIngestionRequest objects
+        
+        Returns:
+            List aligned with requests - each entry is either the
+            DecisionTrace or the exception raised while constructing it
+        """
+        logger.info(f"Starting batch decision trace construction for {len(requests)} requests")
+        
+        # Only requests in Gmail message mode need a message fetch
+        message_mode = [
+            not req.email_thread and not req.gmail_thread_id and bool(req.gmail_message_id)
+            for req in requests
+        ]
+        message_ids = [
+            req.gmail_message_id
+            for req, is_message in zip(requests, message_mode) if is_message
+        ]
+        # Requests in Gmail thread mode share one multi-thread fetch
+        thread_ids = [
+            req.gmail_thread_id
+            for req in requests if not req.email_thread and req.gmail_thread_id
+        ]
+        messages: Dict[str, Optional[Dict[str, Any]]] = {}
+        threads: Dict[str, Optional[Dict[str, Any]]] = {}
+        try:
+            if message_ids:
+                messages = await gmail_service.get_messages_batch(message_ids)
+            if thread_ids:
+                threads = await gmail_service.get_threads(thread_ids)
+        except Exception as e:
+            # Requests missing from the prefetch fetch (and fail) on their own
+            logger.warning(f"Gmail prefetch failed, fetching per request: {e}")
+        
+        async def _resolve(
+            req: EmailIngestionRequest,
+            is_message: bool
+        ) -> Tuple[str, str]:
+            if is_message and req.gmail_message_id in messages:
+                message = messages[req.gmail_message_id]
+                if not message:
+                    raise ValueError(f"Message {req.gmail_message_id} not found")
+                return self._format_message_text(message), "gmail"
+            if req.gmail_thread_id in threads:
+                thread = threads[req.gmail_thread_id]
+                if not thread:
+                    raise ValueError(f"Thread {req.gmail_thread_id} not found")
+                return thread["combined_text"], "gmail"
+            return await self._resolve_email_text(req)
+        
+        resolved = await asyncio.gather(
+            *[_resolve(req, is_message) for req, is_message in zip(requests, message_mode)],
+            return_exceptions=True
+        )
+        
+        # One batched extraction for every thread that passes the pre-filter
+        to_extract = [
+            i for i, item in enumerate(resolved)
+            if not isinstance(item, BaseException) and not is_low_signal_email(item[0])
+        ]
+        extractions = await extract_decisions_from_emails([
+            (resolved[i][0], requests[i].customer_name, requests[i].decision_type.value)
+            for i in to_extract
+        ])
+        extracted_by_index = dict(zip(to_extract, extractions))
+        
+        async def _construct(i: int) -> DecisionTrace:
+            item = resolved[i]
+            if isinstance(item, BaseException):
+                raise item
+            email_text, source = item
+            return await self._finalize_trace(
+                requests[i], email_text, source, extracted_by_index.get(i)
+            )
+        
+        return await asyncio.gather(
+            *[_construct(i) for i in range(len(requests))],
+            return_exceptions=True
+        )
+    
+    async def _resolve_email_text(
+        self,
+        request: EmailIngestionRequest
+    ) -> Tuple[str, str]:
+        """
+        Resolve the email text to analyze for a request.
+        
+        Returns:
+            Tuple of (email_text, source)
+        """
         if request.email_thread:
             # Manual paste mode
-            email_text = request.email_thread
-            source = "manual"
-        elif request.gmail_thread_id:
+            return request.email_thread, "manual"
+        
+        if request.gmail_thread_id:
             # Gmail thread mode
             thread = await gmail_service.get_thread(request.gmail_thread_id)
             if not thread:
                 raise ValueError(f"Thread {request.gmail_thread_id} not found")
-            email_text = thread["combined_text"]
-            source = "gmail"
-        elif request.gmail_message_id:
+            return thread["combined_text"], "gmail"
+        
+        if request.gmail_message_id:
             # Gmail message mode
             message = await gmail_service.get_message(request.gmail_message_id)
             if not message:
                 raise ValueError(f"Message {request.gmail_message_id} not found")
-            email_text = (
-                f"From: {message.get('sender', '')}\n"
-                f"Date: {message.get('date', '')}\n"
-                f"Subject: {message.get('subject', '')}\n\n"
-                f"{message.get('body', '')}"
-            )
-            source = "gmail"
-        else:
-            raise ValueError("No email source provided")
+            return self._format_message_text(message), "gmail"
         
-        # Step 2: Extract decision data using LLM
-        extracted = await extract_decision_from_email(
-            email_text=email_text,
-            customer_name=request.customer_name,
-            decision_type=request.decision_type.value
+        raise ValueError("No email source provided")
+    
+    def _format_message_text(self, message: Dict[str, Any]) -> str:
+        """Format a single parsed Gmail message as text for extraction."""
+        return (
+            f"From: {message.get('sender', '')}\n"
+            f"Date: {message.get('date', '')}\n"
+            f"Subject: {message.get('subject', '')}\n\n"
+            f"{message.get('body', '')}"
         )
         
-        # Step 3: Determine decision timestamp
+    async def _finalize_trace(
+        self,
+        request: EmailIngestionRequest,
+        email_text: str,
+        source: str,
+        extracted: Optional[Dict[str, Any]] = None
+    ) -> DecisionTrace:
+        """
+        Build the decision trace once the email text is known.
+        
+        Runs LLM extraction (unless an extraction is passed in, as the
+        batch path does), enrichment, policy lookup, exception detection
+        and precedent matching.
+        """
+        # Short or off-topic emails skip the LLM and are left pending for review
+        low_signal = extracted is None and is_low_signal_email(email_text)
+        
+        # Steps 2 + 3: Extract decision data using LLM and enrich with
+        # customer data concurrently - enrichment only needs the
+        # customer name, not the extraction result
+        if extracted is not None:
+            customer_data = await get_all_customer_data(request.customer_name)
+        elif low_signal:
+            logger.info(f"Pre-filter skipped LLM extraction for {request.customer_name}")
+            extracted = dict(_PREFILTER_EXTRACTION)
+            customer_data = await get_all_customer_data(request.customer_name)
+        else:
+            extracted, customer_data = await asyncio.gather(
+                extract_decision_from_email(
+                    email_text=email_text,
+                    customer_name=request.customer_name,
+                    decision_type=request.decision_type.value
+                ),
+                get_all_customer_data(request.customer_name)
+            )
+        
+        # Step 4: Determine decision timestamp
         decision_timestamp = self._parse_timestamp(
             extracted.get("decision_timestamp")
         ) or datetime.utcnow()
@@ -109,9 +315,6 @@ class DecisionEngine:
             extracted.get("request_timestamp")
         )
         
-        # Step 4: Enrich with customer data (parallel API calls)
-        customer_data = await get_all_customer_data(request.customer_name)
-        
         # Step 5: Get policy at decision time
         policy_data = policy_store.get_policy_at_time(decision_timestamp)
         
@@ -128,15 +331,7 @@ class DecisionEngine:
         )
         
         # Build outcome component
-        outcome_str = extracted.get("outcome", "pending").lower()
-        outcome_map = {
-            "approved": DecisionOutcome.APPROVED,
-            "rejected": DecisionOutcome.REJECTED,
-            "modified": DecisionOutcome.MODIFIED,
-            "escalated": DecisionOutcome.ESCALATED,
-            "pending": DecisionOutcome.PENDING,
-        }
-        outcome = outcome_map.get(outcome_str, DecisionOutcome.PENDING)
+        outcome = _parse_outcome(extracted.get("outcome") or "pending")
         
         decision_outcome = DecisionOutcomeData(
             outcome=outcome,
@@ -147,8 +342,9 @@ class DecisionEngine:
             reasoning=extracted.get("reasoning")
         )
         
-        # Build evidence list
+        # Build evidence list, plus a field -> value index for lookups below
         evidence = self._build_evidence(customer_data, decision_timestamp)
+        evidence_index = {ev.field: ev.value for ev in evidence}
         
         # Build policy info
         policy_info = None
@@ -173,13 +369,9 @@ class DecisionEngine:
             policy_info.exception_made = True
         
         # Step 7.5: Find precedents using semantic similarity
-        customer_industry = None
-        customer_arr = None
-        for ev in evidence:
-            if ev.field == "industry":
-                customer_industry = ev.value
-            elif ev.field == "arr":
-                customer_arr = ev.value
+        # (not for pre-filtered emails - there is no decision to match)
+        customer_industry = evidence_index.get("industry")
+        customer_arr = evidence_index.get("arr")
         
         # Create decision summary for semantic matching
         decision_summary = self._create_decision_summary(
@@ -190,13 +382,15 @@ class DecisionEngine:
         )
         
         # Use semantic precedent matching (falls back to rule-based if embeddings fail)
-        precedents = await find_semantic_precedents(
-            decision_summary=decision_summary,
-            customer_industry=customer_industry,
-            customer_arr=customer_arr,
-            decision_type=request.decision_type.value,
-            limit=5
-        )
+        precedents = []
+        if not low_signal:
+            precedents = await find_semantic_precedents(
+                decision_summary=decision_summary,
+                customer_industry=customer_industry,
+                customer_arr=customer_arr,
+                decision_type=request.decision_type.value,
+                limit=5
+            )
         
         # Step 8: Construct final decision trace
         decision_trace = DecisionTrace(
@@ -214,7 +408,7 @@ class DecisionEngine:
         )
         
         # Store in memory (kept for backward compatibility)
-        self._decisions[decision_trace.decision_id] = decision_trace
+        self._store_decision(decision_trace)
         
         logger.info(
             f"Decision trace {decision_trace.decision_id} created for {request.customer_name}"
@@ -259,16 +453,12 @@ Outcome: {extracted.get('outcome', 'Unknown')}
             return None
         
         try:
-            dt = None
-            # Handle ISO 8601 format
-            if "T" in timestamp_str:
-                # Remove 'Z' suffix if present
-                ts = timestamp_str.replace("Z", "+00:00")
-                dt = datetime.fromisoformat(ts)
-            else:
-                # Try basic date parsing
-                from dateutil import parser
-                dt = parser.parse(timestamp_str)
+            try:
+                # ISO 8601 (with or without "T", "Z" suffix, offsets) - C parser
+                dt = datetime.fromisoformat(timestamp_str)
+            except ValueError:
+                # Last resort for free-form dates
+                dt = date_parser.parse(timestamp_str)
             
             # Ensure UTC and naive for policy comparison
             if dt and dt.tzinfo is not None:
@@ -290,69 +480,7 @@ Outcome: {extracted.get('outcome', 'Unknown')}
         
         Each piece of evidence captures the value at decision time.
         """
-        evidence = []
-        
-        # CRM evidence
-        if customer_data.get("crm"):
-            crm = customer_data["crm"]
-            evidence.append(Evidence(
-                source="salesforce",
-                field="arr",
-                value=crm.get("arr"),
-                captured_at=crm.get("retrieved_at", decision_timestamp)
-            ))
-            evidence.append(Evidence(
-                source="salesforce",
-                field="tier",
-                value=crm.get("tier"),
-                captured_at=crm.get("retrieved_at", decision_timestamp)
-            ))
-            evidence.append(Evidence(
-                source="salesforce",
-                field="industry",
-                value=crm.get("industry"),
-                captured_at=crm.get("retrieved_at", decision_timestamp)
-            ))
-        
-        # Support evidence
-        if customer_data.get("support"):
-            support = customer_data["support"]
-            evidence.append(Evidence(
-                source="zendesk",
-                field="sev1_tickets",
-                value=support.get("sev1_tickets"),
-                captured_at=support.get("retrieved_at", decision_timestamp)
-            ))
-            evidence.append(Evidence(
-                source="zendesk",
-                field="satisfaction_score",
-                value=support.get("satisfaction_score"),
-                captured_at=support.get("retrieved_at", decision_timestamp)
-            ))
-        
-        # Finance evidence
-        if customer_data.get("finance"):
-            finance = customer_data["finance"]
-            evidence.append(Evidence(
-                source="stripe",
-                field="margin_percent",
-                value=finance.get("margin_percent"),
-                captured_at=finance.get("retrieved_at", decision_timestamp)
-            ))
-            evidence.append(Evidence(
-                source="stripe",
-                field="ltv",
-                value=finance.get("ltv"),
-                captured_at=finance.get("retrieved_at", decision_timestamp)
-            ))
-            evidence.append(Evidence(
-                source="stripe",
-                field="payment_status",
-                value=finance.get("payment_status"),
-                captured_at=finance.get("retrieved_at", decision_timestamp)
-            ))
-        
-        return evidence
+        return build_evidence(customer_data, decision_timestamp)
     
     def _detect_policy_exceptions(
         self,
@@ -366,59 +494,7 @@ Outcome: {extracted.get('outcome', 'Unknown')}
         Compares the final discount against policy limits and
         returns a list of exceptions.
         """
-        exceptions = []
-        
-        if not final_discount or not policy_data:
-            return exceptions
-        
-        # Parse discount percentage
-        try:
-            # Handle "15%" or "15" format
-            discount_value = float(final_discount.replace("%", "").strip())
-        except (ValueError, AttributeError):
-            logger.warning(f"Could not parse discount: {final_discount}")
-            return exceptions
-        
-        # Get policy limits
-        limits = policy_data.get("rules", {}).get("discount_limits", {})
-        standard_limit = limits.get("standard_limit", 10)
-        manager_limit = limits.get("manager_limit", 15)
-        vp_limit = limits.get("vp_limit", 20)
-        
-        # Check standard limit
-        if discount_value > standard_limit:
-            if discount_value <= manager_limit:
-                # Within manager authority - note but not a major exception
-                exceptions.append(PolicyException(
-                    exception_type="exceeds_standard_limit",
-                    description=f"Discount {discount_value}% exceeds standard limit of {standard_limit}%",
-                    policy_limit=f"{standard_limit}%",
-                    actual_value=f"{discount_value}%",
-                    deviation=f"{discount_value - standard_limit}%",
-                    approved_by="Manager (within manager limit)"
-                ))
-            elif discount_value <= vp_limit:
-                # Requires VP approval
-                exceptions.append(PolicyException(
-                    exception_type="requires_vp_approval",
-                    description=f"Discount {discount_value}% exceeds manager limit of {manager_limit}%",
-                    policy_limit=f"{manager_limit}%",
-                    actual_value=f"{discount_value}%",
-                    deviation=f"{discount_value - manager_limit}%",
-                    approved_by="VP (within VP limit)"
-                ))
-            else:
-                # Exceeds all standard limits
-                exceptions.append(PolicyException(
-                    exception_type="exceeds_all_standard_limits",
-                    description=f"Discount {discount_value}% exceeds VP limit of {vp_limit}%",
-                    policy_limit=f"{vp_limit}%",
-                    actual_value=f"{discount_value}%",
-                    deviation=f"{discount_value - vp_limit}%",
-                    approved_by="Executive exception required"
-                ))
-        
-        return exceptions
+        return detect_policy_exceptions(final_discount, policy_data)
     
     async def get_decision(self, decision_id: str) -> Optional[DecisionTrace]:
         """
@@ -426,7 +502,10 @@ Outcome: {extracted.get('outcome', 'Unknown')}
         
         Currently from in-memory store. Part 2 will use Neo4j.
         """
-        return self._decisions.get(decision_id)
+        decision_trace = self._decisions.get(decision_id)
+        if decision_trace is not None:
+            self._decisions.move_to_end(decision_id)
+        return decision_trace
     
     async def list_decisions(
         self,
@@ -436,18 +515,16 @@ Outcome: {extracted.get('outcome', 'Unknown')}
         """
         List decisions, optionally filtered by customer.
         """
-        decisions = list(self._decisions.values())
-        
         if customer_name:
-            decisions = [
-                d for d in decisions 
-                if d.request.customer.lower() == customer_name.lower()
-            ]
+            index = self._by_customer.get(customer_name.lower(), [])
+        else:
+            index = self._by_time
         
-        # Sort by timestamp descending
-        decisions.sort(key=lambda d: d.timestamp, reverse=True)
+        if limit <= 0:
+            return []
         
-        return decisions[:limit]
+        # Indexes are sorted ascending, so take the tail for newest first
+        return [self._decisions[decision_id] for _, decision_id in reversed(index[-limit:])]
 
 
 # =============================================================================
@@ -464,3 +541,10 @@ decision_engine = DecisionEngine()
 async def construct_decision_trace(request: EmailIngestionRequest) -> DecisionTrace:
     """Convenience function for decision trace construction."""
     return await decision_engine.construct_decision_trace(request)
+
+
+async def construct_decision_traces(
+    requests: List[EmailIngestionRequest]
+) -> List[Union[DecisionTrace, Exception]]:
+    """Convenience function for batch decision trace construction."""
+    return await decision_engine.construct_decision_traces(requests)
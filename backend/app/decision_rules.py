@@ -0,0 +1,161 @@
+"""
+Decision Rules - Per-Trace Evidence and Policy Exception Helpers
+
+Pure functions used by the decision engine for every trace:
+- Pre-filtering low-signal emails before LLM extraction
+- Building the evidence list from enrichment data
+- Detecting policy exceptions for a final discount
+
+Kept free of I/O and fully annotated so the module can be compiled
+ahead of time with mypyc (`mypyc app/decision_rules.py`); the pure
+Python module is used when no compiled extension is present.
+"""
+import re
+import logging
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from .models import Evidence, PolicyException
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Evidence captured per enrichment section: (section, source system, fields)
+EVIDENCE_SPEC: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("crm", "salesforce", ("arr", "tier", "industry")),
+    ("support", "zendesk", ("sev1_tickets", "satisfaction_score")),
+    ("finance", "stripe", ("margin_percent", "ltv", "payment_status")),
+)
+
+# Exception templates per tier, indexed by how many limits the discount exceeds
+# minus one: (exception_type, exceeded limit label, approved_by)
+_EXCEPTION_TIERS: Tuple[Tuple[str, str, str], ...] = (
+    ("exceeds_standard_limit", "standard", "Manager (within manager limit)"),
+    ("requires_vp_approval", "manager", "VP (within VP limit)"),
+    ("exceeds_all_standard_limits", "VP", "Executive exception required"),
+)
+
+# Emails shorter than this cannot describe a decision worth extracting
+LOW_SIGNAL_MIN_CHARS = 50
+
+# At least one of these must appear for an email to go to the LLM
+_DECISION_KEYWORDS_RE = re.compile(
+    r"discount|pric|renew|quote|approv|reject|%|percent|credit|refund|contract|payment|deal",
+    re.IGNORECASE
+)
+
+# Leading number of a discount string such as "15%", "15 %" or "12.5"
+_DISCOUNT_RE = re.compile(r"(-?\d+(?:\.\d+)?)\s*%?")
+
+
+# =============================================================================
+# RULE FUNCTIONS
+# =============================================================================
+
+def is_low_signal_email(email_text: str) -> bool:
+    """
+    Cheap pre-filter for emails that cannot contain a pricing decision.
+    
+    Returns:
+        True if the email is too short or mentions no decision keywords,
+        in which case LLM extraction can be skipped
+    """
+    if len(email_text.strip()) < LOW_SIGNAL_MIN_CHARS:
+        return True
+    return _DECISION_KEYWORDS_RE.search(email_text) is None
+
+
+def parse_discount(discount: Optional[str]) -> Optional[float]:
+    """
+    Parse a discount string ("15%" or "15") into a number.
+    
+    Returns:
+        Discount percentage, or None if it cannot be parsed
+    """
+    if not isinstance(discount, str):
+        return None
+    match = _DISCOUNT_RE.search(discount)
+    if match is None:
+        return None
+    return float(match.group(1))
+
+
+def build_evidence(
+    customer_data: Dict[str, Any],
+    decision_timestamp: datetime
+) -> List[Evidence]:
+    """
+    Build evidence list from customer data.
+    
+    Each piece of evidence captures the value at decision time.
+    """
+    evidence: List[Evidence] = []
+    
+    for section, source, fields in EVIDENCE_SPEC:
+        data = customer_data.get(section)
+        if not data:
+            continue
+        captured_at = data.get("retrieved_at", decision_timestamp)
+        # Values come from our own enrichment dicts, so skip validation
+        for field in fields:
+            evidence.append(Evidence.model_construct(
+                source=source,
+                field=field,
+                value=data.get(field),
+                captured_at=captured_at
+            ))
+    
+    return evidence
+
+
+def detect_policy_exceptions(
+    final_discount: Optional[str],
+    policy_data: Optional[Dict[str, Any]]
+) -> List[PolicyException]:
+    """
+    Detect if the decision violated any policy limits.
+    
+    Compares the final discount against policy limits and
+    returns a list of exceptions.
+    """
+    exceptions: List[PolicyException] = []
+    
+    if not final_discount or not policy_data:
+        return exceptions
+    
+    parsed = parse_discount(final_discount)
+    if parsed is None:
+        logger.warning(f"Could not parse discount: {final_discount}")
+        return exceptions
+    discount_value: float = parsed
+    
+    # Get policy limits
+    limits: Dict[str, Any] = policy_data.get("rules", {}).get("discount_limits", {})
+    standard_limit = limits.get("standard_limit", 10)
+    manager_limit = limits.get("manager_limit", 15)
+    vp_limit = limits.get("vp_limit", 20)
+    
+    tier_limits = (standard_limit, manager_limit, vp_limit)
+    
+    # Number of limits strictly below the discount picks the tier
+    tier = bisect_left(tier_limits, discount_value) - 1
+    if tier < 0:
+        return exceptions
+    
+    exception_type, limit_label, approved_by = _EXCEPTION_TIERS[tier]
+    exceeded_limit = tier_limits[tier]
+    exceptions.append(PolicyException.model_construct(
+        exception_type=exception_type,
+        description=f"Discount {discount_value}% exceeds {limit_label} limit of {exceeded_limit}%",
+        policy_limit=f"{exceeded_limit}%",
+        actual_value=f"{discount_value}%",
+        deviation=f"{discount_value - exceeded_limit}%",
+        approved_by=approved_by
+    ))
+    
+    return exceptions
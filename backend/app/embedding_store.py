@@ -0,0 +1,244 @@
+"""
+Embedding Store - Contiguous In-Memory Vector Store
+
+Keeps embeddings as one int8 matrix (one unit-length row per id, with a
+per-row scale) plus parallel id bookkeeping, so similarity against many
+stored vectors is a single matrix-vector product with no per-call list
+to array conversion.
+
+Used for precedent embeddings in graph_operations and the semantic tier
+of the extraction cache. A store can be saved to and loaded from an .npz
+file so embeddings survive restarts.
+"""
+import os
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# QUANTIZATION HELPERS
+# =============================================================================
+
+def normalize_embedding(embedding: Sequence[float]) -> Optional[np.ndarray]:
+    """Convert an embedding to a unit-length float32 vector (None if empty or zero)."""
+    if embedding is None or len(embedding) == 0:
+        return None
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm == 0:
+        return None
+    return vector / norm
+
+
+def quantize_embedding(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Quantize a vector to int8 with a per-vector scale.
+    
+    Returns:
+        (int8 vector, scale) such that vector ~= int8 vector * scale
+    """
+    max_abs = float(np.abs(vector).max())
+    scale = max_abs / 127 if max_abs > 0 else 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+# =============================================================================
+# EMBEDDING STORE CLASS
+# =============================================================================
+
+class EmbeddingStore:
+    """
+    Append-mostly SoA store of int8-quantized unit embeddings keyed by id.
+    
+    Rows live in a preallocated matrix whose capacity doubles when full
+    (amortized O(1) add). Beyond max_size the oldest id is evicted by
+    moving the last row into its slot, keeping rows contiguous.
+    """
+    
+    def __init__(self, max_size: int = 10000, initial_capacity: int = 64):
+        """Initialize an empty store; the dimension is fixed by the first add."""
+        self.max_size = max_size
+        self._initial_capacity = initial_capacity
+        self._dim: Optional[int] = None
+        self._vectors = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._ids: List[str] = []
+        # id -> row, in insertion order (oldest first)
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._ids)
+    
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+    
+    def add(self, item_id: str, embedding: Sequence[float]) -> bool:
+        """
+        Add or replace the embedding for an id.
+        
+        An embedding with a different dimension than the stored ones (a
+        different embedding model) clears the store first.
+        
+        Returns:
+            False if the embedding was empty or all zeros
+        """
+        vector = normalize_embedding(embedding)
+        if vector is None:
+            return False
+        
+        if self._dim is not None and vector.shape[0] != self._dim:
+            logger.info(
+                f"Embedding dimension changed {self._dim} -> {vector.shape[0]}, "
+                f"clearing {len(self)} stored vectors"
+            )
+            self.clear()
+        if self._dim is None:
+            self._dim = vector.shape[0]
+            self._vectors = np.empty((self._initial_capacity, self._dim), dtype=np.int8)
+            self._scales = np.empty(self._initial_capacity, dtype=np.float32)
+        
+        quantized, scale = quantize_embedding(vector)
+        
+        row = self._rows.get(item_id)
+        if row is None:
+            row = len(self._ids)
+            if row == len(self._vectors):
+                self._grow()
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+        
+        self._vectors[row] = quantized
+        self._scales[row] = scale
+        
+        while len(self._ids) > self.max_size:
+            self.remove(next(iter(self._rows)))
+        return True
+    
+    def remove(self, item_id: str) -> None:
+        """Remove an id, moving the last row into its slot."""
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        
+        last = len(self._ids) - 1
+        if row != last:
+            moved_id = self._ids[last]
+            self._vectors[row] = self._vectors[last]
+            self._scales[row] = self._scales[last]
+            self._ids[row] = moved_id
+            self._rows[moved_id] = row
+        self._ids.pop()
+    
+    def clear(self) -> None:
+        """Remove all embeddings and forget the dimension."""
+        self._dim = None
+        self._vectors = np.empty((0, 0), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+        self._ids = []
+        self._rows = OrderedDict()
+    
+    def scores(
+        self,
+        query_embedding: Sequence[float],
+        ids: Optional[Sequence[str]] = None
+    ) -> Tuple[List[str], np.ndarray]:
+        """
+        Cosine similarity of a query against stored embeddings.
+        
+        Args:
+            query_embedding: Query vector (any scale)
+            ids: Restrict to these ids (missing ones are skipped); all if None
+        
+        Returns:
+            (ids scored, float32 scores) in matching order
+        """
+        query = normalize_embedding(query_embedding)
+        if query is None or self._dim is None or query.shape[0] != self._dim:
+            return [], np.zeros(0, dtype=np.float32)
+        
+        count = len(self._ids)
+        if ids is None:
+            scored_ids = list(self._ids)
+            vectors = self._vectors[:count]
+            scales = self._scales[:count]
+        else:
+            scored_ids = [i for i in ids if i in self._rows]
+            rows = [self._rows[i] for i in scored_ids]
+            vectors = self._vectors[rows]
+            scales = self._scales[rows]
+        
+        if not scored_ids:
+            return [], np.zeros(0, dtype=np.float32)
+        
+        query_q, query_scale = quantize_embedding(query)
+        
+        # Integer dot products (int32 accumulation - int16 would overflow at 768 dims)
+        dots = vectors.astype(np.int32) @ query_q.astype(np.int32)
+        scores = dots.astype(np.float32) * scales * query_scale
+        # Rounding error can push identical vectors slightly past 1.0
+        return scored_ids, np.clip(scores, -1.0, 1.0)
+    
+    def save(self, path: str) -> None:
+        """
+        Write the store to an .npz file (replaced atomically).
+        
+        Rows are written oldest first, so eviction order survives a reload.
+        """
+        order = list(self._rows)
+        rows = [self._rows[item_id] for item_id in order]
+        dim = self._dim or 0
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                ids=np.array(order, dtype=str),
+                vectors=self._vectors[rows] if rows else np.empty((0, dim), dtype=np.int8),
+                scales=self._scales[rows] if rows else np.empty(0, dtype=np.float32)
+            )
+        os.replace(tmp_path, path)
+    
+    def load(self, path: str) -> int:
+        """
+        Replace the store's contents with those saved at path.
+        
+        Returns:
+            Number of embeddings loaded (0 if the file is missing)
+        """
+        if not os.path.exists(path):
+            return 0
+        
+        with np.load(path, allow_pickle=False) as data:
+            ids = [str(item_id) for item_id in data["ids"]][-self.max_size:]
+            vectors = data["vectors"][-self.max_size:].astype(np.int8)
+            scales = data["scales"][-self.max_size:].astype(np.float32)
+        
+        self.clear()
+        if not ids:
+            return 0
+        
+        count = len(ids)
+        capacity = max(self._initial_capacity, count)
+        self._dim = vectors.shape[1]
+        self._vectors = np.empty((capacity, self._dim), dtype=np.int8)
+        self._scales = np.empty(capacity, dtype=np.float32)
+        self._vectors[:count] = vectors
+        self._scales[:count] = scales
+        self._ids = ids
+        self._rows = OrderedDict((item_id, row) for row, item_id in enumerate(ids))
+        return count
+    
+    def _grow(self) -> None:
+        """Double the row capacity, copying existing rows."""
+        capacity = max(len(self._vectors) * 2, self._initial_capacity)
+        vectors = np.empty((capacity, self._dim), dtype=np.int8)
+        scales = np.empty(capacity, dtype=np.float32)
+        count = len(self._ids)
+        vectors[:count] = self._vectors[:count]
+        scales[:count] = self._scales[:count]
+        self._vectors = vectors
+        self._scales = scales
@@ -65,7 +65,7 @@ IMPORTANT:
 Generate the explanation now:"""
     
     try:
-        response = gemini_service._model.generate_content(prompt)
+        response = await gemini_service._model.generate_content_async(prompt)
         explanation = response.text.strip()
         
         logger.info(f"Generated explanation for decision {decision.get('id', 'unknown')}")
@@ -80,7 +80,7 @@ Generate the explanation now:"""
 def _format_decision_for_prompt(decision: Dict[str, Any]) -> str:
     """Format decision data for LLM prompt."""
     
-    formatted = f"""
+    parts = [f"""
 DECISION ID: {decision.get('id')}
 TIMESTAMP: {decision.get('timestamp')}
 OUTCOME: {decision.get('outcome')}
@@ -97,36 +97,37 @@ DECISION:
 - Reasoning: {decision.get('decision_reasoning')}
 
 EVIDENCE:
-"""
+"""]
     
     evidence_list = decision.get('evidence', [])
     if evidence_list:
-        for evidence in evidence_list:
-            field = evidence.get('field', 'unknown')
-            value = evidence.get('value', 'N/A')
-            source = evidence.get('source', 'unknown')
-            captured_at = evidence.get('captured_at', 'unknown')
-            formatted += f"- {field}: {value} (from {source} at {captured_at})\n"
+        parts.extend(
+            f"- {evidence.get('field', 'unknown')}: {evidence.get('value', 'N/A')} "
+            f"(from {evidence.get('source', 'unknown')} at {evidence.get('captured_at', 'unknown')})\n"
+            for evidence in evidence_list
+        )
     else:
-        formatted += "- No evidence captured\n"
+        parts.append("- No evidence captured\n")
     
     policy = decision.get('policy')
     if policy:
-        formatted += f"""
+        parts.append(f"""
 POLICY:
 - Version: {policy.get('version')}
 - Effective From: {policy.get('effective_from')}
 - Standard Limit: {policy.get('standard_limit')}
 - Manager Limit: {policy.get('manager_limit')}
-"""
+""")
     
     precedents = decision.get('precedents', [])
     if precedents:
-        formatted += "\nPRECEDENTS:\n"
-        for prec in precedents:
-            formatted += f"- {prec.get('customer', 'Unknown')}: {prec.get('final_action', 'Unknown')} on {prec.get('timestamp', 'Unknown')}\n"
+        parts.append("\nPRECEDENTS:\n")
+        parts.extend(
+            f"- {prec.get('customer', 'Unknown')}: {prec.get('final_action', 'Unknown')} on {prec.get('timestamp', 'Unknown')}\n"
+            for prec in precedents
+        )
     
-    return formatted
+    return "".join(parts)
 
 
 def _template_explanation(decision: Dict[str, Any]) -> str:
@@ -139,7 +140,7 @@ def _template_explanation(decision: Dict[str, Any]) -> str:
     decision_maker = decision.get('decision_maker_email', 'Unknown')
     reasoning = decision.get('decision_reasoning', 'No reasoning provided')
     
-    explanation = f"""## Decision: {outcome}
+    parts = [f"""## Decision: {outcome}
 
 **Summary:** {final_action} for {customer} on {timestamp}.
 
@@ -148,32 +149,35 @@ def _template_explanation(decision: Dict[str, Any]) -> str:
 **Reasoning:** {reasoning}
 
 ## Evidence at Decision Time
-"""
+"""]
     
     evidence_list = decision.get('evidence', [])
     if evidence_list:
-        for evidence in evidence_list:
-            field = evidence.get('field', 'unknown')
-            value = evidence.get('value', 'N/A')
-            source = evidence.get('source', 'unknown')
-            captured_at = evidence.get('captured_at', 'unknown')
-            explanation += f"- **{field}** ({source}): {value} - captured at {captured_at}\n"
+        parts.extend(
+            f"- **{evidence.get('field', 'unknown')}** ({evidence.get('source', 'unknown')}): "
+            f"{evidence.get('value', 'N/A')} - captured at {evidence.get('captured_at', 'unknown')}\n"
+            for evidence in evidence_list
+        )
     else:
-        explanation += "- No evidence captured\n"
+        parts.append("- No evidence captured\n")
     
     policy = decision.get('policy')
     if policy:
-        explanation += f"\n## Policy Context\nPolicy version {policy.get('version')} was in effect. "
-        explanation += f"Standard limit: {policy.get('standard_limit', 'N/A')}, "
-        explanation += f"Manager limit: {policy.get('manager_limit', 'N/A')}.\n"
+        parts.append(
+            f"\n## Policy Context\nPolicy version {policy.get('version')} was in effect. "
+            f"Standard limit: {policy.get('standard_limit', 'N/A')}, "
+            f"Manager limit: {policy.get('manager_limit', 'N/A')}.\n"
+        )
     
     precedents = decision.get('precedents', [])
     if precedents:
-        explanation += "\n## Precedents Considered\n"
-        for prec in precedents:
-            explanation += f"- {prec.get('customer', 'Unknown')}: {prec.get('outcome', 'Unknown')} on {prec.get('timestamp', 'Unknown')}\n"
+        parts.append("\n## Precedents Considered\n")
+        parts.extend(
+            f"- {prec.get('customer', 'Unknown')}: {prec.get('outcome', 'Unknown')} on {prec.get('timestamp', 'Unknown')}\n"
+            for prec in precedents
+        )
     
-    return explanation
+    return "".join(parts)
 
 
 async def generate_similarity_explanation(
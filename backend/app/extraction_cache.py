@@ -0,0 +1,396 @@
+"""
+Extraction Cache - Reuse LLM Extractions for Repeated Email Threads
+
+Two-tier cache in front of Gemini decision extraction:
+1. Exact tier: SHA-256 of (model, email_text, customer_name, decision_type)
+2. Semantic tier (opt-in, EXTRACTION_CACHE_SIMILARITY > 0): cosine
+   similarity of email embeddings, so forwarded or lightly re-quoted
+   threads reuse a previous extraction
+
+Semantic matches are scoped to the same customer, decision type and
+set of percentages and email addresses in the text, so a thread that
+gained a reply with a new figure or participant never reuses the
+extraction made before that reply.
+
+Entries can be persisted through a CacheBackend. Set EXTRACTION_CACHE_DB
+to a file path to use the built-in SQLite backend, so entries survive
+restarts and are shared between worker processes. Persistence runs on a
+background writer thread, so a put never blocks the event loop on disk
+I/O or on another worker's write lock.
+"""
+import os
+import re
+import copy
+import time
+import queue
+import sqlite3
+import threading
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Protocol, Callable
+
+import numpy as np
+
+try:
+    import orjson
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+    
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    import json
+    
+    _dumps = json.dumps
+    _loads = json.loads
+
+from .embedding_store import EmbeddingStore, normalize_embedding
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+# Maximum number of cached extractions (LRU eviction beyond this)
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "1024"))
+
+# SQLite file for persistent entries (empty = in-memory only)
+EXTRACTION_CACHE_DB = os.getenv("EXTRACTION_CACHE_DB", "")
+
+# Seconds a SQLite write waits for another worker's lock before failing
+EXTRACTION_CACHE_DB_TIMEOUT = 1.0
+
+# Minimum cosine similarity for a semantic hit (0, the default, disables
+# the semantic tier). A thread that only grew a reply embeds at ~1.0 to
+# its earlier version, so values around 0.97 are the lowest sensible ones.
+EXTRACTION_CACHE_SIMILARITY = float(os.getenv("EXTRACTION_CACHE_SIMILARITY", "0"))
+
+# Decision facts a semantic hit must share with the cached thread
+_FACT_RE = re.compile(r'\d+(?:\.\d+)?\s*%|[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+
+
+# =============================================================================
+# PERSISTENT BACKENDS
+# =============================================================================
+
+# (key, scope, unit email embedding or None, extraction)
+CacheRow = Tuple[str, str, Optional[np.ndarray], Dict[str, Any]]
+
+
+class CacheBackend(Protocol):
+    """Persistent store behind the in-memory cache tiers."""
+    
+    def load(self, limit: int) -> List[CacheRow]:
+        """Return up to limit most recent entries, oldest first, dropping older ones."""
+        ...
+    
+    def save(self, row: CacheRow) -> None:
+        """Insert or replace an entry."""
+        ...
+    
+    def clear(self) -> None:
+        """Remove all entries."""
+        ...
+
+
+class SQLiteCacheBackend:
+    """CacheBackend storing entries in a single SQLite table."""
+    
+    def __init__(self, db_path: str):
+        """
+        Open (creating if needed) the SQLite store.
+        
+        WAL lets workers read while another one writes, and the short
+        lock timeout bounds how long a write waits for another worker.
+        
+        Raises:
+            sqlite3.Error: If the database cannot be opened
+        """
+        self._db = sqlite3.connect(
+            db_path,
+            timeout=EXTRACTION_CACHE_DB_TIMEOUT,
+            check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, scope TEXT NOT NULL, embedding BLOB, "
+                "response TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+    
+    def load(self, limit: int) -> List[CacheRow]:
+        # Entries evicted from memory stay on disk (another worker may
+        # still use them); the table is trimmed to the newest here instead
+        with self._db:
+            self._db.execute(
+                "DELETE FROM extractions WHERE ts < "
+                "(SELECT ts FROM extractions ORDER BY ts DESC LIMIT 1 OFFSET ?)",
+                (max(limit - 1, 0),)
+            )
+        rows = self._db.execute(
+            "SELECT key, scope, embedding, response FROM "
+            "(SELECT * FROM extractions ORDER BY ts DESC LIMIT ?) ORDER BY ts",
+            (limit,)
+        ).fetchall()
+        return [
+            (
+                key,
+                scope,
+                np.frombuffer(embedding, dtype=np.float32) if embedding else None,
+                _loads(response)
+            )
+            for key, scope, embedding, response in rows
+        ]
+    
+    def save(self, row: CacheRow) -> None:
+        key, scope, vector, extraction = row
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO extractions (key, scope, embedding, response, ts) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    scope,
+                    vector.astype(np.float32).tobytes() if vector is not None else None,
+                    _dumps(extraction),
+                    time.time()
+                )
+            )
+    
+    def clear(self) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM extractions")
+
+
+# =============================================================================
+# EXTRACTION CACHE CLASS
+# =============================================================================
+
+class ExtractionCache:
+    """
+    LRU cache of extraction results with a semantic fallback,
+    optionally backed by a persistent CacheBackend.
+    
+    Entries are keyed by a content hash. Entries stored with an
+    embedding also take part in semantic lookups, which compare the
+    query embedding against the int8-quantized embeddings of the same
+    scope in one matrix product.
+    """
+    
+    def __init__(
+        self,
+        max_entries: int = EXTRACTION_CACHE_SIZE,
+        similarity_threshold: float = EXTRACTION_CACHE_SIMILARITY,
+        db_path: str = EXTRACTION_CACHE_DB,
+        backend: Optional[CacheBackend] = None,
+        enabled: bool = True
+    ):
+        """
+        Initialize the cache, loading persisted entries from the backend.
+        
+        Args:
+            max_entries: LRU capacity
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            db_path: SQLite file for the default backend (ignored if backend is given)
+            backend: Persistent backend to use instead of SQLite
+            enabled: False turns every lookup into a miss and every put into a no-op
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.enabled = enabled
+        self._backend: Optional[CacheBackend] = None
+        # Backend writes, applied in order by one background thread
+        self._writes: "queue.Queue[Tuple[str, Callable[[], None]]]" = queue.Queue()
+        
+        # key -> (scope, extraction)
+        self._entries: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        # scope -> int8-quantized email embeddings of that scope's entries
+        self._scope_embeddings: Dict[str, EmbeddingStore] = {}
+        
+        if not enabled:
+            return
+        if backend is None and db_path:
+            try:
+                backend = SQLiteCacheBackend(db_path)
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open extraction cache at {db_path}: {e}")
+        if backend is not None:
+            self._load_backend(backend)
+    
+    @property
+    def semantic_enabled(self) -> bool:
+        """Whether semantic lookups are enabled."""
+        return self.enabled and self.similarity_threshold > 0
+    
+    @staticmethod
+    def make_key(
+        email_text: str,
+        customer_name: str,
+        decision_type: str,
+        model: str = ""
+    ) -> str:
+        """Build the exact-match cache key for an extraction request by a model."""
+        digest = hashlib.sha256()
+        for part in (model, email_text, customer_name, decision_type):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+    
+    @staticmethod
+    def make_scope(customer_name: str, decision_type: str, email_text: str) -> str:
+        """
+        Build the scope semantic matches are restricted to.
+        
+        Besides customer and decision type, the scope includes a digest
+        of the percentages and email addresses in the thread: the cached
+        discount, outcome and people are only reused for a text that
+        mentions exactly the same ones.
+        """
+        facts = sorted({
+            re.sub(r'\s+', '', fact.lower()) for fact in _FACT_RE.findall(email_text)
+        })
+        digest = hashlib.sha256("\x00".join(facts).encode("utf-8")).hexdigest()[:16]
+        return f"{customer_name.strip().lower()}|{decision_type}|{digest}"
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Exact-match lookup.
+        
+        Returns:
+            Copy of the cached extraction, or None on miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        self._entries.move_to_end(key)
+        return copy.deepcopy(entry[1])
+    
+    def find_similar(
+        self,
+        embedding: List[float],
+        scope: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Semantic lookup against cached embeddings in the same scope.
+        
+        Returns:
+            Copy of the most similar cached extraction if its similarity
+            meets the threshold, otherwise None
+        """
+        store = self._scope_embeddings.get(scope)
+        if not self.semantic_enabled or store is None:
+            return None
+        
+        keys, scores = store.scores(embedding)
+        if not keys:
+            return None
+        
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None
+        
+        key = keys[best]
+        logger.info(f"Semantic extraction cache hit (similarity {scores[best]:.3f})")
+        return self.get(key)
+    
+    def put(
+        self,
+        key: str,
+        extraction: Dict[str, Any],
+        scope: str,
+        embedding: Optional[List[float]] = None
+    ) -> None:
+        """Store an extraction, optionally with its email embedding."""
+        if not self.enabled:
+            return
+        vector = normalize_embedding(embedding) if embedding else None
+        stored = copy.deepcopy(extraction)
+        self._insert(key, scope, stored, vector)
+        
+        backend = self._backend
+        if backend is not None:
+            self._write(
+                "persist extraction cache entry",
+                lambda: backend.save((key, scope, vector, stored))
+            )
+    
+    def clear(self) -> None:
+        """Remove all cached extractions (including persisted ones)."""
+        self._entries.clear()
+        self._scope_embeddings.clear()
+        if self._backend is not None:
+            self._write("clear persisted extraction cache", self._backend.clear)
+    
+    def flush(self) -> None:
+        """Block until every queued backend write has been applied."""
+        self._writes.join()
+    
+    def _write(self, action: str, write: Callable[[], None]) -> None:
+        """Queue a backend write for the writer thread."""
+        self._writes.put((action, write))
+    
+    def _write_loop(self) -> None:
+        """Writer thread: apply queued backend writes in order."""
+        while True:
+            action, write = self._writes.get()
+            try:
+                write()
+            except Exception as e:
+                logger.warning(f"Failed to {action}: {e}")
+            finally:
+                self._writes.task_done()
+    
+    def _insert(
+        self,
+        key: str,
+        scope: str,
+        extraction: Dict[str, Any],
+        vector: Optional[np.ndarray]
+    ) -> None:
+        """Add an entry to the in-memory tiers, evicting the least recently used."""
+        self._entries[key] = (scope, extraction)
+        self._entries.move_to_end(key)
+        
+        if vector is not None:
+            store = self._scope_embeddings.get(scope)
+            if store is None:
+                store = self._scope_embeddings[scope] = EmbeddingStore(
+                    max_size=self.max_entries,
+                    initial_capacity=4
+                )
+            store.add(key, vector)
+        
+        while len(self._entries) > self.max_entries:
+            evicted, (evicted_scope, _) = self._entries.popitem(last=False)
+            store = self._scope_embeddings.get(evicted_scope)
+            if store is not None:
+                store.remove(evicted)
+                if not len(store):
+                    del self._scope_embeddings[evicted_scope]
+    
+    def _load_backend(self, backend: CacheBackend) -> None:
+        """Attach a persistent backend and load its most recent entries into memory."""
+        try:
+            rows = backend.load(self.max_entries)
+        except Exception as e:
+            logger.error(f"Failed to load extraction cache entries: {e}")
+            return
+        
+        for key, scope, vector, extraction in rows:
+            self._insert(key, scope, extraction, vector)
+        self._backend = backend
+        threading.Thread(
+            target=self._write_loop,
+            name="extraction-cache-writer",
+            daemon=True
+        ).start()
+        
+        logger.info(f"Loaded {len(rows)} cached extractions")
+    
+    def __len__(self) -> int:
+        return len(self._entries)
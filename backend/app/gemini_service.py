@@ -9,15 +9,30 @@ Part 3 enhancements:
 - Natural language similarity explanations
 """
 import os
+import re
+import copy
 import json
+import time
+import asyncio
 import logging
-from datetime import datetime
-from typing import Dict, Any, Optional, List
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple, Union
 
+from dateutil import parser as date_parser
 from dotenv import load_dotenv
 import google.generativeai as genai
+import httpx
 import numpy as np
 
+try:
+    # C parser; orjson.JSONDecodeError subclasses json.JSONDecodeError
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    from json import loads as json_loads
+
+from app.extraction_cache import ExtractionCache
+from app.local_embedder import local_embedder
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -27,7 +42,12 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 
 # Model configuration for deterministic extraction
-GEMINI_MODEL = "gemini-2.5-flash"
+# Extraction model; GEMINI_MODEL can select a cheaper/faster tier at runtime
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# Larger model an extraction is retried on once when GEMINI_MODEL returns
+# invalid JSON (empty = no retry)
+GEMINI_ESCALATION_MODEL = os.getenv("GEMINI_ESCALATION_MODEL", "gemini-2.5-pro")
 GENERATION_CONFIG = {
     "temperature": 0.1,         # Low temperature for consistent extraction
     "top_p": 0.95,
@@ -35,26 +55,192 @@ GENERATION_CONFIG = {
     "max_output_tokens": 2000,
 }
 
+# Email text analyzed per thread (LLM prompt and regex fallback). Longer
+# threads keep their opening request and their latest replies.
+MAX_EMAIL_CHARS = int(os.getenv("MAX_EMAIL_CHARS", "32768"))
+
+# Input token budget for one extraction prompt (gemini-2.5-flash accepts ~1M)
+GEMINI_MAX_INPUT_TOKENS = int(os.getenv("GEMINI_MAX_INPUT_TOKENS", "1000000"))
+
+# Extractions are only cached while sampling is (near-)deterministic;
+# at higher temperatures a repeat call is expected to differ
+EXTRACTION_CACHE_MAX_TEMPERATURE = 0.2
+EXTRACTION_CACHE_ENABLED = GENERATION_CONFIG["temperature"] <= EXTRACTION_CACHE_MAX_TEMPERATURE
+
+# Email threads packed into one batched extraction prompt, and the output
+# budget for such a prompt (one JSON object per thread)
+EXTRACTION_BATCH_SIZE = int(os.getenv("EXTRACTION_BATCH_SIZE", "8"))
+BATCH_GENERATION_CONFIG = {**GENERATION_CONFIG, "max_output_tokens": 8192}
+
+# Maximum concurrent Gemini generation requests per process
+GEMINI_MAX_CONCURRENT = int(os.getenv("GEMINI_MAX_CONCURRENT", "16"))
+
 # Embedding model for semantic similarity
 EMBEDDING_MODEL = "models/text-embedding-004"
 
+# Tail of a thread embedded for semantic extraction cache lookups. Threads
+# are oldest message first and the embedding models only take ~256 (local)
+# / 2048 (remote) tokens; embedding the head would give threads with the
+# same request but different replies the same vector.
+EXTRACTION_CACHE_EMBED_CHARS = 1024
+
+# "gemini" (text-embedding-004 over the API) or "local" (in-process ONNX MiniLM)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "gemini").lower()
+
+# REST endpoint for batched embeddings (called over a pooled keep-alive client)
+GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+EMBEDDING_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+EMBEDDING_HTTP_TIMEOUT = 30.0
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 multiplexing in httpx
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
 
 # =============================================================================
-# ENHANCED EXTRACTION PROMPT
+# PATTERNS (fallback extraction and normalization)
 # =============================================================================
 
-DECISION_EXTRACTION_PROMPT = """You are an expert at extracting structured decision data from business email threads.
+_NUM_RE = re.compile(r'\d+(?:\.\d+)?')
 
-Analyze the following email thread about a {decision_type} for customer "{customer_name}".
+# Everything the fallback extractor looks for, in one left-to-right scan:
+# email addresses, 1-2 digit percentages, and approval/rejection phrases.
+# The named group that matched tells which kind of token a hit is.
+# Address parts are capped at their RFC 5321 lengths so long runs of word
+# characters cost linear rather than quadratic backtracking.
+_FALLBACK_SCAN_RE = re.compile(
+    r"(?P<email>[\w.+-]{1,64}@[\w-]{1,63}\.[\w.-]{1,253})"
+    r"|(?P<pct>\d{1,2})%"
+    r"|\b(?:"
+    r"(?P<approve>approved|approve|lgtm|ok|go ahead|sounds good|fine by me)"
+    r"|(?P<reject>rejected|denied|no|can't do|too high)"
+    r")\b",
+    re.IGNORECASE
+)
 
-EMAIL THREAD:
----
-{email_text}
----
+# Outcome codes returned by _fallback_extract_core
+_OUTCOME_NONE, _OUTCOME_APPROVE, _OUTCOME_REJECT = 0, 1, 2
+
+
+def _fallback_extract_core(text: str) -> Tuple[List[str], List[str], int]:
+    """
+    Scan an email once for addresses, percentages and outcome phrases.
+    
+    Returns:
+        (emails, percentages without '%', outcome code); approval wins
+        over rejection when both appear
+    """
+    emails: List[str] = []
+    percentages: List[str] = []
+    outcome = _OUTCOME_NONE
+    
+    for match in _FALLBACK_SCAN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == "email":
+            emails.append(match.group(kind))
+        elif kind == "pct":
+            percentages.append(match.group(kind))
+        elif kind == "approve":
+            outcome = _OUTCOME_APPROVE
+        elif outcome == _OUTCOME_NONE:
+            outcome = _OUTCOME_REJECT
+    
+    return emails, percentages, outcome
+
+
+# =============================================================================
+# TIMESTAMPS
+# =============================================================================
+
+# (epoch seconds, ISO string) of the last timestamp handed out
+_last_now_iso = (0.0, "")
+
+
+def _now_iso() -> str:
+    """
+    Current UTC time as a naive ISO 8601 string (same format as utcnow()).
+    
+    Reuses the previous string for calls within the same millisecond,
+    which covers bursts of extractions finishing together.
+    """
+    global _last_now_iso
+    now = time.time()
+    last_time, last_text = _last_now_iso
+    if 0 <= now - last_time < 0.001:
+        return last_text
+    text = datetime.fromtimestamp(now, tz=timezone.utc).replace(tzinfo=None).isoformat()
+    _last_now_iso = (now, text)
+    return text
+
+
+# =============================================================================
+# FIELD NORMALIZERS (used by _validate_and_normalize)
+# =============================================================================
+
+_VALID_OUTCOMES = frozenset(['approved', 'rejected', 'modified', 'escalated', 'pending'])
+
+
+def _norm_pct(value: Any) -> Any:
+    """Normalize a percentage to "<number>%" (unchanged if it has no number)."""
+    text = value if isinstance(value, str) else str(value)
+    # Fast path: the model almost always returns an already normalized "15%"
+    if text.endswith('%') and text[:-1].isdecimal():
+        return text
+    match = _NUM_RE.search(text)
+    return match.group(0) + '%' if match else value
+
+
+def _norm_ts(value: Any) -> Any:
+    """Normalize a timestamp string to ISO 8601 (current time if unparseable)."""
+    if not isinstance(value, str):
+        return value
+    try:
+        # The prompt asks for ISO 8601, which the C parser handles directly;
+        # dateutil covers anything else the model returns
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        pass
+    try:
+        return date_parser.parse(value).isoformat()
+    except Exception:
+        logger.warning(f"Could not parse timestamp {value}, using current time")
+        return _now_iso()
+
+
+def _norm_outcome(value: Any) -> str:
+    """Lowercase the outcome, defaulting invalid values to 'pending'."""
+    outcome = str(value).lower()
+    if outcome not in _VALID_OUTCOMES:
+        logger.warning(f"Invalid outcome '{outcome}', defaulting to 'pending'")
+        return 'pending'
+    return outcome
+
+
+# (field, normalizer, skip empty values)
+_FIELD_OPS = (
+    ('requested_discount', _norm_pct, True),
+    ('final_discount', _norm_pct, True),
+    ('request_timestamp', _norm_ts, True),
+    ('decision_timestamp', _norm_ts, True),
+    ('outcome', _norm_outcome, False),
+)
 
+
+# =============================================================================
+# ENHANCED EXTRACTION PROMPT
+# =============================================================================
+
+# Static instructions, identical for every call. Kept as the prompt prefix
+# (never formatted) so repeated requests share a byte-identical prefix that
+# Gemini can reuse via implicit prefix caching.
+_STATIC_PROMPT_PREFIX = """You are an expert at extracting structured decision data from business email threads.
+
+You will be given an email thread about a business decision for a named customer.
 Extract the decision details and return a JSON object with the following structure:
 
-{{
+{
     "requested_discount": "string - the discount percentage requested (e.g., '18%')",
     "final_discount": "string - the discount percentage approved/denied (e.g., '15%')",
     "outcome": "string - one of: 'approved', 'rejected', 'modified', 'escalated', 'pending'",
@@ -66,7 +252,7 @@ Extract the decision details and return a JSON object with the following structu
     "decision_timestamp": "string - ISO 8601 timestamp when decision was made (or null)",
     "reason": "string - why the request was made (customer's justification)",
     "reasoning": "string - explanation for the final decision",
-    "confidence": {{
+    "confidence": {
         "requested_discount": 0.95,
         "final_discount": 0.90,
         "outcome": 0.98,
@@ -75,9 +261,9 @@ Extract the decision details and return a JSON object with the following structu
         "timestamps": 0.7,
         "reason": 0.85,
         "reasoning": 0.90
-    }},
+    },
     "notes": "string - any additional observations about the decision"
-}}
+}
 
 IMPORTANT RULES:
 1. Extract exact values from the email - do not invent data
@@ -100,9 +286,209 @@ CONFIDENCE SCORES (0.0 to 1.0):
 - 0.8-0.9 = Strongly implied, clear context
 - 0.6-0.7 = Inferred from limited context
 - <0.6 = Guessed or unclear
+"""
+
+# Per-request suffix - the only part that varies between calls
+_PROMPT_SUFFIX_TEMPLATE = """
+Analyze the following email thread about a {decision_type} for customer "{customer_name}".
+
+EMAIL THREAD:
+---
+{email_text}
+---
 
 Return ONLY the JSON object, no additional text or markdown formatting."""
 
+# Prefix + suffix template pre-split around its placeholders once at import,
+# so building a prompt is a single join (no per-call format parsing, and the
+# email text is copied once)
+_PROMPT_SEGMENTS = (_STATIC_PROMPT_PREFIX + _PROMPT_SUFFIX_TEMPLATE.format(
+    decision_type="\x00", customer_name="\x00", email_text="\x00"
+)).split("\x00")
+
+
+# Conservative characters-per-token ratio for local estimates. Real
+# SentencePiece tokens average ~4 characters of English, so this over-counts.
+_CHARS_PER_TOKEN_ESTIMATE = 3
+
+_PROMPT_OVERHEAD_TOKENS = -(-len("".join(_PROMPT_SEGMENTS)) // _CHARS_PER_TOKEN_ESTIMATE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Upper-bound estimate of the token count of text, computed locally."""
+    return -(-len(text) // _CHARS_PER_TOKEN_ESTIMATE)
+
+
+def fit_email_to_token_budget(
+    email_text: Optional[str],
+    max_input_tokens: int = GEMINI_MAX_INPUT_TOKENS
+) -> str:
+    """
+    Bound an email thread for the extraction prompt.
+    
+    The thread is capped at MAX_EMAIL_CHARS, or less if the prompt would
+    otherwise exceed the input token budget, with bound_email_text (head
+    and tail kept). Checking locally avoids paying a full round-trip for
+    a request the API would reject as too long.
+    """
+    budget = max_input_tokens - _PROMPT_OVERHEAD_TOKENS
+    max_chars = max(budget, 0) * _CHARS_PER_TOKEN_ESTIMATE
+    if email_text and max_chars < min(len(email_text), MAX_EMAIL_CHARS):
+        logger.warning(
+            f"Email thread of {len(email_text)} chars exceeds the prompt token budget, "
+            f"keeping its head and tail within {max_chars} chars"
+        )
+    return bound_email_text(email_text, min(MAX_EMAIL_CHARS, max_chars))
+
+
+def bound_email_text(email_text: Optional[str], max_chars: int = MAX_EMAIL_CHARS) -> str:
+    """
+    Cap an email thread at max_chars, keeping its head and tail.
+    
+    The request is at the start of a thread and the decision in the
+    latest reply at the end, so the middle is dropped (marked with
+    "[...]"): three quarters of the budget come from the head, the rest
+    from the tail.
+    """
+    if not email_text:
+        return ""
+    if len(email_text) <= max_chars:
+        return email_text
+    
+    tail_chars = max_chars // 4
+    if not tail_chars:
+        return email_text[:max_chars]
+    return f"{email_text[:max_chars - tail_chars]}\n[...]\n{email_text[-tail_chars:]}"
+
+
+def build_extraction_prompt(email_text: str, customer_name: str, decision_type: str) -> str:
+    """Build the extraction prompt: static instruction prefix + per-request suffix."""
+    head, after_type, after_customer, tail = _PROMPT_SEGMENTS
+    return "".join((head, decision_type, after_type, customer_name, after_customer, email_text, tail))
+
+
+# Suffix for several threads in one prompt; threads are passed as a JSON
+# array and the model answers with one extraction object per thread id
+_BATCH_PROMPT_SUFFIX_HEAD = """
+Analyze each of the following email threads about a {decision_type}. The threads are
+given as a JSON array of objects with "id", "customer" and "text" fields; extract each
+thread independently, for its own customer.
+
+EMAIL THREADS:
+"""
+
+_BATCH_PROMPT_SUFFIX_TAIL = """
+
+Return ONLY a JSON object of the form {"results": [...]} containing one extraction object
+(with the structure above) per thread, each with an added "id" field set to the thread's id.
+No additional text or markdown formatting."""
+
+
+def build_batch_extraction_prompt(items: List[Tuple[str, str]], decision_type: str) -> str:
+    """
+    Build one extraction prompt covering several email threads.
+    
+    Args:
+        items: (email_text, customer_name) tuples; the thread id is the index
+        decision_type: Decision type shared by all threads
+    """
+    threads = [
+        {"id": i, "customer": customer_name, "text": email_text}
+        for i, (email_text, customer_name) in enumerate(items)
+    ]
+    return "".join((
+        _STATIC_PROMPT_PREFIX,
+        _BATCH_PROMPT_SUFFIX_HEAD.format(decision_type=decision_type),
+        json.dumps(threads, ensure_ascii=False, indent=1),
+        _BATCH_PROMPT_SUFFIX_TAIL
+    ))
+
+
+# =============================================================================
+# STREAMING HELPERS
+# =============================================================================
+
+def strip_code_fences(text: str) -> str:
+    """
+    Remove a surrounding markdown code fence (```json ... ```) from a reply.
+    
+    Slices between the end of the opening fence line and the closing
+    fence; text without a leading fence is returned stripped.
+    """
+    text = text.strip()
+    if not text.startswith("```"):
+        return text
+    
+    last_fence = text.rfind("```")
+    if last_fence == 0:
+        last_fence = len(text)
+    first_newline = text.find("\n", 0, last_fence)
+    if first_newline == -1:
+        # Single-line fence: drop the ticks only
+        return text[3:last_fence].strip()
+    return text[first_newline + 1:last_fence].strip()
+
+
+def _chunk_text(chunk: Any) -> str:
+    """Text of one streamed response chunk ("" for chunks without text parts)."""
+    try:
+        return chunk.text
+    except ValueError:
+        # e.g. the final finish_reason chunk
+        return ""
+
+
+class _JsonObjectScanner:
+    """
+    Accumulate streamed text until the first top-level JSON object closes.
+    
+    Tracks brace depth outside of string literals so a caller can stop
+    reading as soon as the object is complete instead of waiting for the
+    end of the stream. Any leading markdown fence is dropped.
+    """
+    
+    def __init__(self):
+        self._parts: List[str] = []
+        self._offset = 0
+        self._start = -1
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Add a chunk of text.
+        
+        Returns:
+            The complete JSON object text once it has closed, else None
+        """
+        self._parts.append(chunk)
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == "{":
+                if self._start < 0:
+                    self._start = self._offset + i
+                self._depth += 1
+            elif self._start >= 0:
+                if ch == '"':
+                    self._in_string = True
+                elif ch == "}":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        return "".join(self._parts)[self._start:self._offset + i + 1]
+        self._offset += len(chunk)
+        return None
+    
+    def text(self) -> str:
+        """Everything accumulated so far (used when no object closed)."""
+        return "".join(self._parts)
+
 
 # =============================================================================
 # GEMINI SERVICE CLASS
@@ -123,7 +509,11 @@ class GeminiService:
         """Initialize Gemini client with API key."""
         self._api_key = os.getenv("GEMINI_API_KEY")
         self._model = None
+        self._escalation_model = None
+        self._http: Optional[httpx.AsyncClient] = None
         self._initialized = False
+        self._extraction_cache = ExtractionCache(enabled=EXTRACTION_CACHE_ENABLED)
+        self._generation_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENT)
         
         if self._api_key:
             self._initialize()
@@ -138,6 +528,20 @@ class GeminiService:
                 model_name=GEMINI_MODEL,
                 generation_config=GENERATION_CONFIG
             )
+            if GEMINI_ESCALATION_MODEL and GEMINI_ESCALATION_MODEL != GEMINI_MODEL:
+                self._escalation_model = genai.GenerativeModel(
+                    model_name=GEMINI_ESCALATION_MODEL,
+                    generation_config=GENERATION_CONFIG
+                )
+            # One pooled client for all embedding calls: keep-alive (and HTTP/2
+            # when h2 is installed) instead of a new connection per request
+            self._http = httpx.AsyncClient(
+                base_url=GEMINI_API_BASE,
+                headers={"x-goog-api-key": self._api_key},
+                http2=_HTTP2_AVAILABLE,
+                limits=EMBEDDING_HTTP_LIMITS,
+                timeout=EMBEDDING_HTTP_TIMEOUT
+            )
             self._initialized = True
             logger.info(f"Gemini service initialized with model {GEMINI_MODEL}")
         except Exception as e:
@@ -148,6 +552,12 @@ class GeminiService:
         """Check if Gemini service is available."""
         return self._initialized and self._model is not None
     
+    async def close(self) -> None:
+        """Close the pooled HTTP client (call on application shutdown)."""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
     async def extract_decision_from_email(
         self,
         email_text: str,
@@ -182,39 +592,46 @@ class GeminiService:
                 "Please set GEMINI_API_KEY in environment variables."
             )
         
-        # Build prompt
-        prompt = DECISION_EXTRACTION_PROMPT.format(
-            decision_type=decision_type,
-            customer_name=customer_name,
-            email_text=email_text
+        # Check extraction cache (exact hash, then semantic neighbour)
+        cache_key = ExtractionCache.make_key(email_text, customer_name, decision_type, GEMINI_MODEL)
+        cache_scope = ExtractionCache.make_scope(customer_name, decision_type, email_text)
+        cached = self._extraction_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Extraction cache hit for {customer_name}")
+            cached["_extraction_metadata"]["cache_hit"] = "exact"
+            return cached
+        
+        email_embedding = None
+        if self._extraction_cache.semantic_enabled:
+            email_embedding = await self.generate_embeddings(
+                email_text[-EXTRACTION_CACHE_EMBED_CHARS:]
+            )
+            if email_embedding:
+                cached = self._extraction_cache.find_similar(email_embedding, cache_scope)
+                if cached is not None:
+                    cached["_extraction_metadata"]["cache_hit"] = "semantic"
+                    # Promote to the exact tier for this text
+                    self._extraction_cache.put(cache_key, cached, cache_scope)
+                    return cached
+        
+        # Build prompt (trimmed locally if it would exceed the model's input limit)
+        prompt = build_extraction_prompt(
+            fit_email_to_token_budget(email_text),
+            customer_name,
+            decision_type
         )
         
         try:
-            # Call Gemini
-            response = self._model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Parse JSON response
-            # Handle potential markdown code blocks
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-                if response_text.endswith("```"):
-                    response_text = response_text[:-3]
-            
-            response_text = response_text.strip()
-            extracted_data = json.loads(response_text)
+            # Call Gemini, streaming until the JSON object is complete
+            extracted_data, model_name = await self._generate_json(prompt)
             
             # Validate and normalize
             extracted_data = self._validate_and_normalize(extracted_data)
             
             # Add metadata
             extracted_data["_extraction_metadata"] = {
-                "model": GEMINI_MODEL,
-                "extracted_at": datetime.utcnow().isoformat(),
+                "model": model_name,
+                "extracted_at": _now_iso(),
                 "customer_name": customer_name
             }
             
@@ -225,18 +642,219 @@ class GeminiService:
                 if avg_confidence < 0.7:
                     logger.warning(f"Low confidence extraction for {customer_name}")
             
+            self._extraction_cache.put(cache_key, extracted_data, cache_scope, email_embedding)
+            
             logger.info(f"Successfully extracted decision data for {customer_name}")
             return extracted_data
             
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse Gemini response as JSON: {e}")
-            logger.error(f"Raw response: {response_text[:500]}")
+            logger.error(f"Raw response: {e.doc[:500]}")
             raise RuntimeError(f"LLM extraction failed: Invalid JSON response")
             
         except Exception as e:
             logger.error(f"Gemini extraction failed: {e}")
             raise RuntimeError(f"LLM extraction failed: {str(e)}")
     
+    async def _generate_json(self, prompt: str) -> Tuple[Any, str]:
+        """
+        Generate and parse a JSON reply, escalating once on invalid JSON.
+        
+        Returns:
+            (parsed JSON, name of the model that produced it)
+        
+        Raises:
+            json.JSONDecodeError: If no model returned valid JSON
+        """
+        async with self._generation_slots:
+            response_text = await self._stream_json_response(prompt)
+        try:
+            return json_loads(strip_code_fences(response_text)), GEMINI_MODEL
+        except json.JSONDecodeError as e:
+            if self._escalation_model is None:
+                raise
+            logger.warning(
+                f"{GEMINI_MODEL} returned invalid JSON ({e}), "
+                f"retrying with {GEMINI_ESCALATION_MODEL}"
+            )
+        
+        async with self._generation_slots:
+            response_text = await self._stream_json_response(
+                prompt, model=self._escalation_model
+            )
+        return json_loads(strip_code_fences(response_text)), GEMINI_ESCALATION_MODEL
+    
+    async def _stream_json_response(
+        self,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        model: Optional[Any] = None
+    ) -> str:
+        """Stream a response (from the extraction model unless given) and return its JSON object text."""
+        response = await (model or self._model).generate_content_async(
+            prompt,
+            stream=True,
+            generation_config=generation_config
+        )
+        scanner = _JsonObjectScanner()
+        async for chunk in response:
+            result = scanner.feed(_chunk_text(chunk))
+            if result is not None:
+                return result
+        return scanner.text()
+    
+    async def extract_batch(
+        self,
+        items: List[Tuple[str, str, str]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract decision data from several email threads concurrently.
+        
+        Requests overlap on the network, bounded by GEMINI_MAX_CONCURRENT.
+        
+        Args:
+            items: (email_text, customer_name, decision_type) tuples
+        
+        Returns:
+            One extraction dict per item, in order, or the exception
+            raised for that item
+        """
+        return await asyncio.gather(
+            *(
+                self.extract_decision_from_email(email_text, customer_name, decision_type)
+                for email_text, customer_name, decision_type in items
+            ),
+            return_exceptions=True
+        )
+    
+    async def extract_decisions_batch(
+        self,
+        items: List[Tuple[str, str, str]]
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Extract decision data from several email threads with packed prompts.
+        
+        Uncached threads of the same decision type are sent up to
+        EXTRACTION_BATCH_SIZE per prompt, so N threads cost about
+        N / EXTRACTION_BATCH_SIZE round-trips instead of N. Threads the
+        model leaves out of (or garbles in) a batched reply are retried
+        one by one with extract_decision_from_email.
+        
+        Args:
+            items: (email_text, customer_name, decision_type) tuples
+        
+        Returns:
+            One extraction dict per item, in order, or the exception
+            raised for that item
+        
+        Raises:
+            ValueError: If Gemini is not configured
+        """
+        if not self.is_available():
+            raise ValueError(
+                "Gemini service not available. "
+                "Please set GEMINI_API_KEY in environment variables."
+            )
+        
+        results: List[Union[Dict[str, Any], Exception, None]] = [None] * len(items)
+        
+        # Exact cache hits first; identical uncached threads are extracted once
+        pending: Dict[str, List[int]] = {}
+        for i, (email_text, customer_name, decision_type) in enumerate(items):
+            key = ExtractionCache.make_key(email_text, customer_name, decision_type, GEMINI_MODEL)
+            cached = self._extraction_cache.get(key)
+            if cached is not None:
+                cached["_extraction_metadata"]["cache_hit"] = "exact"
+                results[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+        
+        # Group the distinct misses by decision type, then into prompt-sized batches
+        by_type: Dict[str, List[str]] = {}
+        for key, indices in pending.items():
+            by_type.setdefault(items[indices[0]][2], []).append(key)
+        batches = [
+            (decision_type, keys[start:start + EXTRACTION_BATCH_SIZE])
+            for decision_type, keys in by_type.items()
+            for start in range(0, len(keys), EXTRACTION_BATCH_SIZE)
+        ]
+        
+        async def extract_packed(decision_type: str, keys: List[str]) -> None:
+            threads = [items[pending[key][0]][:2] for key in keys]
+            extracted = await self._extract_packed(threads, decision_type)
+            for key, (email_text, customer_name), extraction in zip(keys, threads, extracted):
+                if extraction is None:
+                    continue
+                extraction["_extraction_metadata"] = {
+                    "model": GEMINI_MODEL,
+                    "extracted_at": _now_iso(),
+                    "customer_name": customer_name,
+                    "batched": True
+                }
+                self._extraction_cache.put(
+                    key, extraction, ExtractionCache.make_scope(customer_name, decision_type, email_text)
+                )
+                for i in pending[key]:
+                    results[i] = copy.deepcopy(extraction)
+        
+        await asyncio.gather(*(extract_packed(t, keys) for t, keys in batches))
+        
+        # Anything the batched replies did not cover goes through the single-thread path
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            logger.info(f"Re-extracting {len(missing)} threads individually")
+            retried = await self.extract_batch([items[i] for i in missing])
+            for i, result in zip(missing, retried):
+                results[i] = result
+        
+        return results
+    
+    async def _extract_packed(
+        self,
+        threads: List[Tuple[str, str]],
+        decision_type: str
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Extract several threads with one Gemini call.
+        
+        Returns:
+            One normalized extraction per thread, None where the reply
+            had no usable object for it (all None if the call failed)
+        """
+        prompt = build_batch_extraction_prompt(
+            [
+                (fit_email_to_token_budget(email_text), customer_name)
+                for email_text, customer_name in threads
+            ],
+            decision_type
+        )
+        
+        try:
+            async with self._generation_slots:
+                response_text = (
+                    await self._stream_json_response(prompt, BATCH_GENERATION_CONFIG)
+                ).strip()
+            response_text = strip_code_fences(response_text)
+            reply = json_loads(response_text)
+        except Exception as e:
+            logger.warning(f"Batched extraction of {len(threads)} threads failed: {e}")
+            return [None] * len(threads)
+        
+        extracted: List[Optional[Dict[str, Any]]] = [None] * len(threads)
+        entries = reply.get("results") if isinstance(reply, dict) else None
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            thread_id = entry.pop("id", None)
+            if isinstance(thread_id, int) and 0 <= thread_id < len(threads):
+                extracted[thread_id] = self._validate_and_normalize(entry)
+        
+        logger.info(
+            f"Batched extraction covered {sum(e is not None for e in extracted)}"
+            f"/{len(threads)} threads in one call"
+        )
+        return extracted
+    
     def _validate_and_normalize(self, extracted_data: Dict) -> Dict:
         """
         Validate and normalize extracted data.
@@ -246,41 +864,14 @@ class GeminiService:
         - Validate email addresses
         - Set defaults for missing fields
         """
-        import re
-        from dateutil import parser as date_parser
-        
-        # Normalize percentages
-        for field in ['requested_discount', 'final_discount']:
-            if field in extracted_data and extracted_data[field]:
-                value = str(extracted_data[field])
-                # Extract numbers and add %
-                numbers = re.findall(r'\d+(?:\.\d+)?', value)
-                if numbers:
-                    extracted_data[field] = f"{numbers[0]}%"
-        
-        # Parse timestamps
-        for field in ['request_timestamp', 'decision_timestamp']:
-            if field in extracted_data and extracted_data[field]:
-                value = extracted_data[field]
-                if isinstance(value, str):
-                    try:
-                        # Try parsing ISO format or various date formats
-                        parsed_date = date_parser.parse(value)
-                        extracted_data[field] = parsed_date.isoformat()
-                    except Exception:
-                        # If parsing fails, use current time
-                        logger.warning(f"Could not parse timestamp {value}, using current time")
-                        extracted_data[field] = datetime.utcnow().isoformat()
-        
-        # Validate outcome
-        if 'outcome' in extracted_data:
-            outcome = str(extracted_data['outcome']).lower()
-            valid_outcomes = ['approved', 'rejected', 'modified', 'escalated', 'pending']
-            if outcome not in valid_outcomes:
-                logger.warning(f"Invalid outcome '{outcome}', defaulting to 'pending'")
-                extracted_data['outcome'] = 'pending'
-            else:
-                extracted_data['outcome'] = outcome
+        # Single pass over the fields that need normalizing
+        for field, normalize, skip_empty in _FIELD_OPS:
+            if field not in extracted_data:
+                continue
+            value = extracted_data[field]
+            if skip_empty and not value:
+                continue
+            extracted_data[field] = normalize(value)
         
         # Ensure confidence dict exists
         if 'confidence' not in extracted_data:
@@ -325,7 +916,8 @@ class GeminiService:
         Used when Gemini is unavailable. Provides partial extraction
         based on common email patterns.
         """
-        import re
+        # Bounded input keeps the regex scan cheap on huge threads
+        email_text = bound_email_text(email_text)
         
         result = {
             "requested_discount": None,
@@ -344,21 +936,21 @@ class GeminiService:
             },
             "_extraction_metadata": {
                 "model": "fallback_regex",
-                "extracted_at": datetime.utcnow().isoformat(),
+                "extracted_at": _now_iso(),
                 "customer_name": customer_name,
                 "warning": "Gemini unavailable - used pattern matching"
             }
         }
         
-        # Extract email addresses
-        emails = re.findall(r'[\w.+-]+@[\w-]+\.[\w.-]+', email_text)
+        emails, percentages, outcome = _fallback_extract_core(email_text)
+        
+        # Email addresses
         if len(emails) >= 1:
             result["requestor_email"] = emails[0]
         if len(emails) >= 2:
             result["decision_maker_email"] = emails[-1]
         
-        # Extract percentages
-        percentages = re.findall(r'(\d{1,2})%', email_text)
+        # Percentages
         if len(percentages) >= 1:
             result["requested_discount"] = f"{percentages[0]}%"
         if len(percentages) >= 2:
@@ -366,16 +958,12 @@ class GeminiService:
         elif len(percentages) == 1:
             result["final_discount"] = f"{percentages[0]}%"
         
-        # Detect approval patterns
-        email_lower = email_text.lower()
-        approval_patterns = ["approved", "approve", "lgtm", "ok", "go ahead", "sounds good", "fine by me"]
-        rejection_patterns = ["rejected", "denied", "no", "can't do", "too high"]
-        
-        if any(p in email_lower for p in approval_patterns):
+        # Outcome - approval wins over rejection
+        if outcome == _OUTCOME_APPROVE:
             result["outcome"] = "approved"
             if result["requested_discount"] != result["final_discount"]:
                 result["outcome"] = "modified"
-        elif any(p in email_lower for p in rejection_patterns):
+        elif outcome == _OUTCOME_REJECT:
             result["outcome"] = "rejected"
         
         return result
@@ -397,65 +985,167 @@ class GeminiService:
         Returns:
             List of floats representing the embedding vector
         """
+        if EMBEDDING_BACKEND == "local":
+            embeddings = await self._embed_locally([text])
+            return embeddings[0] if embeddings else []
+        
+        if not self.is_available():
+            logger.warning("Gemini not available for embeddings")
+            return []
+        
+        try:
+            embeddings = await self._embed_remote([text])
+            return embeddings[0]
+        except Exception as e:
+            logger.error(f"Failed to generate embeddings: {e}")
+            return []
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Generate embeddings for several texts in one batched API call.
+        
+        Args:
+            texts: Texts to generate embeddings for
+        
+        Returns:
+            One embedding per input text, in order. Empty list on failure.
+        """
+        if not texts:
+            return []
+        
+        if EMBEDDING_BACKEND == "local":
+            return await self._embed_locally(texts)
+        
         if not self.is_available():
             logger.warning("Gemini not available for embeddings")
             return []
         
         try:
-            result = genai.embed_content(
+            return await self._embed_remote(texts)
+        except Exception as e:
+            logger.error(f"Failed to generate batch embeddings: {e}")
+            return []
+    
+    async def _embed_remote(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with one batchEmbedContents call on the pooled client.
+        
+        Falls back to the SDK (in a worker thread) if the client was closed.
+        
+        Raises:
+            httpx.HTTPError: On transport errors or a non-2xx response
+        """
+        if self._http is None:
+            result = await asyncio.to_thread(
+                genai.embed_content,
                 model=EMBEDDING_MODEL,
-                content=text,
+                content=texts,
                 task_type="retrieval_document"
             )
             return result['embedding']
+        
+        response = await self._http.post(
+            f"/{EMBEDDING_MODEL}:batchEmbedContents",
+            json={
+                "requests": [
+                    {
+                        "model": EMBEDDING_MODEL,
+                        "content": {"parts": [{"text": text}]},
+                        "taskType": "RETRIEVAL_DOCUMENT"
+                    }
+                    for text in texts
+                ]
+            }
+        )
+        response.raise_for_status()
+        return [e["values"] for e in json_loads(response.content)["embeddings"]]
+    
+    async def _embed_locally(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the in-process ONNX model (one batched run, off the event loop)."""
+        try:
+            vectors = await asyncio.to_thread(local_embedder.embed, texts)
         except Exception as e:
-            logger.error(f"Failed to generate embeddings: {e}")
+            logger.error(f"Local embedding failed: {e}")
             return []
+        if vectors is None:
+            return []
+        return vectors.tolist()
     
     async def calculate_similarity(
         self,
-        decision_text: str,
-        precedent_text: str
+        decision: Union[str, List[float], np.ndarray],
+        precedent: Union[str, List[float], np.ndarray]
     ) -> float:
         """
         Calculate semantic similarity between two decisions.
         
-        Uses cosine similarity of embeddings.
+        Uses cosine similarity of embeddings. Either side may be passed as
+        an already computed embedding (e.g. one cached at ingest time), in
+        which case only the text side is embedded.
         
         Args:
-            decision_text: Text summary of current decision
-            precedent_text: Text summary of precedent decision
+            decision: Text summary of current decision, or its embedding
+            precedent: Text summary of precedent decision, or its embedding
             
         Returns:
             Similarity score 0.0-1.0
         """
         try:
-            # Generate embeddings
-            decision_embedding = await self.generate_embeddings(decision_text)
-            precedent_embedding = await self.generate_embeddings(precedent_text)
-            
-            if not decision_embedding or not precedent_embedding:
-                return 0.0
-            
-            # Calculate cosine similarity
-            decision_vec = np.array(decision_embedding)
-            precedent_vec = np.array(precedent_embedding)
-            
-            dot_product = np.dot(decision_vec, precedent_vec)
-            norm_a = np.linalg.norm(decision_vec)
-            norm_b = np.linalg.norm(precedent_vec)
+            texts = [side for side in (decision, precedent) if isinstance(side, str)]
+            # Embed only the text side(s), both in one batched call
+            embedded = iter(await self.generate_embeddings_batch(texts)) if texts else iter(())
+            decision_embedding, precedent_embedding = (
+                next(embedded, None) if isinstance(side, str) else side
+                for side in (decision, precedent)
+            )
             
-            if norm_a == 0 or norm_b == 0:
+            if (
+                decision_embedding is None or len(decision_embedding) == 0
+                or precedent_embedding is None or len(precedent_embedding) == 0
+            ):
                 return 0.0
             
-            similarity = dot_product / (norm_a * norm_b)
-            
-            return float(similarity)
+            # Calculate cosine similarity (batched path with K=1)
+            return float(self.calculate_similarities(decision_embedding, [precedent_embedding])[0])
         
         except Exception as e:
             logger.error(f"Failed to calculate similarity: {e}")
             return 0.0
     
+    def calculate_similarities(
+        self,
+        query_embedding: List[float],
+        precedent_matrix: Union[np.ndarray, List[List[float]]],
+        normalized: bool = False
+    ) -> np.ndarray:
+        """
+        Cosine similarity of one embedding against many in a single matrix-vector product.
+        
+        Args:
+            query_embedding: Embedding of the current decision
+            precedent_matrix: (K, d) precedent embeddings, one per row
+            normalized: Rows are already unit length (skips row norms)
+        
+        Returns:
+            float32 array of K similarity scores (0.0 for zero vectors)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+        matrix = np.asarray(precedent_matrix, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        
+        query_norm = np.linalg.norm(query)
+        if query_norm == 0 or matrix.size == 0:
+            return np.zeros(len(matrix), dtype=np.float32)
+        
+        scores = matrix @ (query / query_norm)
+        if not normalized:
+            row_norms = np.linalg.norm(matrix, axis=1)
+            # Zero rows score 0 instead of dividing by zero
+            row_norms[row_norms == 0] = np.inf
+            scores /= row_norms
+        return scores
+    
     async def explain_decision_similarity(
         self,
         decision_summary: str,
@@ -494,7 +1184,8 @@ Example: "Both involve enterprise healthcare customers with high ARR experiencin
 Your explanation:"""
         
         try:
-            response = self._model.generate_content(prompt)
+            async with self._generation_slots:
+                response = await self._model.generate_content_async(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Failed to explain similarity: {e}")
@@ -514,7 +1205,8 @@ Your explanation:"""
             raise ValueError("Gemini service not available")
             
         try:
-            response = self._model.generate_content(prompt)
+            async with self._generation_slots:
+                response = await self._model.generate_content_async(prompt)
             return response.text.strip()
         except Exception as e:
             logger.error(f"Chat generation failed: {e}")
@@ -532,7 +1224,10 @@ Your explanation:"""
             "available": self.is_available(),
             "api_key_set": bool(self._api_key),
             "model": GEMINI_MODEL if self.is_available() else None,
-            "embedding_model": EMBEDDING_MODEL if self.is_available() else None,
+            "embedding_model": (
+                "local-onnx" if EMBEDDING_BACKEND == "local"
+                else EMBEDDING_MODEL if self.is_available() else None
+            ),
             "message": "Ready" if self.is_available() else "GEMINI_API_KEY not configured"
         }
 
@@ -557,3 +1252,32 @@ async def extract_decision_from_email(
     return await gemini_service.extract_with_fallback(
         email_text, customer_name, decision_type
     )
+
+
+async def extract_decisions_from_emails(
+    items: List[Tuple[str, str, str]]
+) -> List[Dict[str, Any]]:
+    """
+    Convenience function for batched decision extraction.
+    
+    Uses packed Gemini prompts when available; any thread that still
+    fails (or every thread, without Gemini) gets the pattern fallback.
+    
+    Args:
+        items: (email_text, customer_name, decision_type) tuples
+    """
+    if not items:
+        return []
+    
+    results: List[Any] = [None] * len(items)
+    if gemini_service.is_available():
+        results = await gemini_service.extract_decisions_batch(items)
+    
+    for i, result in enumerate(results):
+        if isinstance(result, dict):
+            continue
+        if result is not None:
+            logger.warning(f"Gemini extraction failed, using fallback: {result}")
+        email_text, customer_name, _ = items[i]
+        results[i] = gemini_service._fallback_extraction(email_text, customer_name)
+    return results
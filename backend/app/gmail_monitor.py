@@ -8,9 +8,12 @@ Provides functionality to:
 - Store decision traces in Neo4j
 """
 import re
+import asyncio
 import logging
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from itertools import islice
+from typing import Dict, List, Optional, Any, Tuple
 
 from app.gmail_service import gmail_service
 from app.decision_engine import decision_engine
@@ -19,6 +22,24 @@ from app.models import EmailIngestionRequest, DecisionType
 
 logger = logging.getLogger(__name__)
 
+# Processed message IDs remembered for de-duplication (oldest forgotten first)
+MAX_PROCESSED_IDS = 50000
+
+# Most recent processed IDs included in get_stats()
+STATS_RECENT_PROCESSED_IDS = 100
+
+# Maximum emails ingested concurrently by batch_ingest (Gmail/Gemini rate limits)
+BATCH_INGEST_MAX_CONCURRENT = 10
+
+# Customer name in a subject line, in priority order: the text after the
+# last " - ", else after the last ": ", else "... for CustomerName"
+_SUBJECT_CUSTOMER_RE = re.compile(
+    r'.* - (?P<dash>.*)'
+    r'|.*: (?P<colon>.*)'
+    r'|.*?\bfor\s+(?P<for>[A-Z][A-Za-z\s]+(?:Corp|Inc|LLC|Ltd|Co)?)',
+    re.DOTALL
+)
+
 
 class GmailMonitor:
     """
@@ -29,8 +50,10 @@ class GmailMonitor:
     """
     
     def __init__(self):
-        """Initialize Gmail monitor with empty processed set."""
-        self.processed_message_ids: set = set()
+        """Initialize Gmail monitor with no processed messages."""
+        # Insertion-ordered so the oldest IDs can be evicted beyond MAX_PROCESSED_IDS
+        self.processed_message_ids: "OrderedDict[str, None]" = OrderedDict()
+        self.processed_total = 0
         self.last_check_time: Optional[datetime] = None
         logger.info("Gmail Monitor initialized")
     
@@ -110,22 +133,9 @@ class GmailMonitor:
         if not subject:
             return "Unknown Customer"
         
-        # Pattern: "Something - CustomerName"
-        if ' - ' in subject:
-            parts = subject.split(' - ')
-            if len(parts) >= 2:
-                return parts[-1].strip()
-        
-        # Pattern: "Something: CustomerName"
-        if ': ' in subject:
-            parts = subject.split(': ')
-            if len(parts) >= 2:
-                return parts[-1].strip()
-        
-        # Pattern: "for CustomerName"
-        match = re.search(r'\bfor\s+([A-Z][A-Za-z\s]+(?:Corp|Inc|LLC|Ltd|Co)?)', subject)
+        match = _SUBJECT_CUSTOMER_RE.match(subject)
         if match:
-            return match.group(1).strip()
+            return match.group(match.lastgroup).strip()
         
         return "Unknown Customer"
     
@@ -133,14 +143,16 @@ class GmailMonitor:
         self,
         message_id: str,
         customer_name: str,
-        auto_save: bool = True
+        auto_save: bool = True,
+        message: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Ingest a single email and create decision trace.
         
         Steps:
         1. Check if already processed
-        2. Fetch email thread from Gmail
+        2. Fetch email thread from Gmail (the message itself is only
+           fetched to find its thread, unless already given)
         3. Construct decision trace using existing decision_engine
         4. Save to Neo4j if auto_save is True
         5. Mark message_id as processed
@@ -149,6 +161,8 @@ class GmailMonitor:
             message_id: Gmail message ID to ingest
             customer_name: Customer name for the decision
             auto_save: Whether to save to Neo4j automatically
+            message: Already fetched message (or search summary) with a
+                     thread_id, to skip the per-message fetch
             
         Returns:
             Dict with success status, decision_id, trace, and any errors
@@ -164,7 +178,8 @@ class GmailMonitor:
         
         try:
             # Get the message to find thread ID
-            message = await gmail_service.get_message(message_id)
+            if not message or not message.get('thread_id'):
+                message = await gmail_service.get_message(message_id, include_body=False)
             if not message:
                 return {
                     "success": False,
@@ -195,7 +210,7 @@ class GmailMonitor:
                     )
             
             # Mark as processed
-            self.processed_message_ids.add(message_id)
+            self._mark_processed(message_id)
             
             logger.info(
                 f"Successfully ingested message {message_id} "
@@ -251,25 +266,78 @@ class GmailMonitor:
                 "message": "No unprocessed emails found"
             }
         
+        # Thread IDs come with the search results; any message missing one
+        # is fetched here in a single batched request rather than one by one
+        missing_thread = [msg['id'] for msg in messages if not msg.get('thread_id')]
+        if missing_thread:
+            try:
+                fetched = await gmail_service.get_messages_batch(missing_thread, include_body=False)
+            except Exception as e:
+                # ingest_email fetches any message still missing its thread ID
+                logger.warning(f"Batch message fetch failed: {e}")
+                fetched = {}
+            for msg in messages:
+                full = fetched.get(msg['id'])
+                if full:
+                    msg['thread_id'] = full.get('thread_id')
+        
+        # Determine customer name for each message
+        if customer_name:
+            customers = [customer_name] * len(messages)
+        else:
+            customers = [
+                self._extract_customer_from_subject(msg.get('subject', ''))
+                for msg in messages
+            ]
+        
+        # Ingest concurrently; each email is dominated by network round-trips
+        slots = asyncio.Semaphore(BATCH_INGEST_MAX_CONCURRENT)
+        
+        async def ingest_bounded(msg: Dict, cust: str) -> Dict[str, Any]:
+            async with slots:
+                return await self.ingest_email(
+                    message_id=msg['id'],
+                    customer_name=cust,
+                    auto_save=True,
+                    message=msg
+                )
+        
+        async def follow(msg: Dict, first: "asyncio.Future[Dict[str, Any]]") -> Dict[str, Any]:
+            # Same thread already being ingested - reuse its trace
+            result = await first
+            if result['success']:
+                self._mark_processed(msg['id'])
+            return {**result, "message_id": msg['id']}
+        
+        # Messages of one thread (for one customer) share a single ingestion:
+        # the thread text, and therefore the LLM extraction, is identical
+        in_flight: Dict[Tuple[str, str], "asyncio.Future[Dict[str, Any]]"] = {}
+        calls = []
+        for msg, cust in zip(messages, customers):
+            thread_key = (msg.get('thread_id') or msg['id'], cust)
+            first = in_flight.get(thread_key)
+            if first is None:
+                first = in_flight[thread_key] = asyncio.ensure_future(ingest_bounded(msg, cust))
+                calls.append(first)
+            else:
+                calls.append(follow(msg, first))
+        
+        if len(in_flight) < len(messages):
+            logger.info(
+                f"{len(messages) - len(in_flight)} messages share a thread with "
+                f"another message in this batch, reusing its ingestion"
+            )
+        
+        outcomes = await asyncio.gather(*calls, return_exceptions=True)
+        
         results = []
         successful = 0
         failed = 0
         
-        for msg in messages:
-            # Determine customer name
-            if customer_name:
-                cust = customer_name
-            else:
-                cust = self._extract_customer_from_subject(
-                    msg.get('subject', '')
-                )
-            
-            # Ingest the email
-            result = await self.ingest_email(
-                message_id=msg['id'],
-                customer_name=cust,
-                auto_save=True
-            )
+        for msg, cust, result in zip(messages, customers, outcomes):
+            if isinstance(result, Exception):
+                logger.error(f"Error ingesting message {msg['id']}: {result}")
+                result = {"success": False, "error": str(result)}
             
             results.append({
                 "message_id": msg['id'],
@@ -296,16 +364,30 @@ class GmailMonitor:
             "results": results
         }
     
+    def _mark_processed(self, message_id: str) -> None:
+        """Remember a processed message ID, forgetting the oldest beyond the cap."""
+        if message_id not in self.processed_message_ids:
+            self.processed_total += 1
+        self.processed_message_ids[message_id] = None
+        while len(self.processed_message_ids) > MAX_PROCESSED_IDS:
+            self.processed_message_ids.popitem(last=False)
+    
     def get_stats(self) -> Dict[str, Any]:
         """
         Get Gmail monitoring statistics.
         
+        Cost does not grow with the number of processed messages: only
+        the most recent STATS_RECENT_PROCESSED_IDS IDs are listed.
+        
         Returns:
-            Dict with processed count, last check time, etc.
+            Dict with processed count, recent processed IDs (newest
+            first), last check time, etc.
         """
         return {
-            "processed_count": len(self.processed_message_ids),
-            "processed_message_ids": list(self.processed_message_ids),
+            "processed_count": self.processed_total,
+            "processed_message_ids": list(
+                islice(reversed(self.processed_message_ids), STATS_RECENT_PROCESSED_IDS)
+            ),
             "last_check_time": (
                 self.last_check_time.isoformat()
                 if self.last_check_time else None
@@ -313,9 +395,10 @@ class GmailMonitor:
         }
     
     def reset_processed(self):
-        """Clear the processed message IDs set."""
+        """Clear the processed message IDs."""
         count = len(self.processed_message_ids)
         self.processed_message_ids.clear()
+        self.processed_total = 0
         logger.info(f"Reset processed messages, cleared {count} IDs")
 
 
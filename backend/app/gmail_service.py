@@ -4,22 +4,47 @@ Gmail Service - Gmail API Integration with OAuth 2.0
 Handles authentication and email operations for decision trace ingestion.
 Supports fetching individual messages, threads, and searching.
 """
+import io
 import os
-import base64
+import re
+import time
 import email
+import binascii
+import functools
+import asyncio
 import logging
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import getaddresses
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+import numpy as np
+
 # Google API imports
+import httplib2
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.model import JsonModel
+
+try:
+    # C parser; orjson.JSONDecodeError subclasses json.JSONDecodeError
+    from orjson import loads as json_loads
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    from json import loads as json_loads
+
+try:
+    # C-backed HTML parser for the text/html body fallback
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -27,6 +52,147 @@ logger = logging.getLogger(__name__)
 # Gmail API scopes - read-only access
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
+# Calls per batch HTTP request. Gmail accepts up to 100, but batches
+# larger than 50 are likely to be rate limited (per-part 429s).
+GMAIL_BATCH_SIZE = 50
+
+# Calls re-sent concurrently, one by one, after failing inside a batch
+GMAIL_REFETCH_CONCURRENCY = 5
+
+# Socket timeout for Gmail API connections (seconds)
+GMAIL_HTTP_TIMEOUT = int(os.getenv("GMAIL_HTTP_TIMEOUT", "30"))
+
+# Parsed full-format messages kept in memory (messages are immutable once
+# delivered; the TTL bounds how stale their labels can get)
+MESSAGE_CACHE_SIZE = int(os.getenv("GMAIL_MESSAGE_CACHE_SIZE", "4096"))
+MESSAGE_CACHE_TTL_SECONDS = 3600
+
+# Partial-response mask for header-only message fetches
+METADATA_FIELDS = "id,threadId,labelIds,payload/headers,snippet"
+
+# How long a check_connection API probe result is served before re-checking
+CONNECTION_CHECK_TTL_SECONDS = 30
+
+# Common RFC 2822 Date header shape: "[Tue, ]1 Jan 2025 10:00:00 [+0000] [(UTC)]"
+_DATE_RE = re.compile(
+    r"(?:[A-Za-z]{3},\s*)?(\d{1,2}) ([A-Za-z]{3}) (\d{4}) (\d{2}):(\d{2}):(\d{2})"
+    r"(?:\s+([+-])(\d{2})(\d{2}))?\s*(?:\(.*\))?$"
+)
+# Decoded body parts kept in memory - thread fetches repeat the same
+# quoted parts across replies
+BODY_DECODE_CACHE_SIZE = 1024
+
+# Tag stripper for the text/html body fallback when selectolax is missing
+# (bytes pattern - UTF-8 continuation bytes never contain < or >)
+_HTML_TAG_RE = re.compile(rb"<[^>]+>")
+
+# base64url -> standard base64 alphabet
+_B64_TRANS = bytes.maketrans(b"-_", b"+/")
+
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun",
+         "jul", "aug", "sep", "oct", "nov", "dec"],
+        start=1
+    )
+}
+
+
+def _parse_email_date(date_str: str) -> datetime:
+    """
+    Parse an email Date header.
+    
+    Handles the common RFC 2822 shape with a precompiled regex and falls
+    back to email.utils.parsedate_to_datetime for anything else, with the
+    same result conventions (aware if an offset is given, naive for
+    -0000 or no offset).
+    
+    Raises:
+        ValueError, TypeError: If the date cannot be parsed
+    """
+    match = _DATE_RE.match(date_str.strip())
+    month = _MONTHS.get(match.group(2).lower()) if match else None
+    if month is None:
+        return email.utils.parsedate_to_datetime(date_str)
+    
+    day, _, year, hour, minute, second, sign, tz_hours, tz_minutes = match.groups()
+    tzinfo = None
+    if sign and not (sign == "-" and tz_hours == "00" and tz_minutes == "00"):
+        offset = timedelta(hours=int(tz_hours), minutes=int(tz_minutes))
+        tzinfo = timezone(-offset if sign == "-" else offset)
+    return datetime(
+        int(year), month, int(day), int(hour), int(minute), int(second),
+        tzinfo=tzinfo
+    )
+
+
+def _html_to_text(html: bytes) -> str:
+    """Convert a UTF-8 HTML body to plain text (script and style content dropped)."""
+    if HTMLParser is None:
+        return _HTML_TAG_RE.sub(b"", html).decode("utf-8", errors="replace")
+    
+    tree = HTMLParser(html)
+    tree.strip_tags(["script", "style"])
+    root = tree.body or tree.root
+    return root.text(separator=" ") if root is not None else ""
+
+
+def _extract_headers(payload: Dict, lower: bool = True) -> Dict[str, str]:
+    """Map a message payload's header names (lowercased by default) to values."""
+    headers = payload.get("headers", ())
+    if lower:
+        return {h["name"].lower(): h["value"] for h in headers}
+    return {h["name"]: h["value"] for h in headers}
+
+
+def _format_message_date(date: Any) -> str:
+    """Format a parsed message date for thread text (empty if missing)."""
+    if not date:
+        return ""
+    return date.isoformat() if isinstance(date, datetime) else str(date)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_recipients(to_header: str) -> Tuple[str, ...]:
+    """
+    Parse a To header into its email addresses.
+    
+    Cached on the raw header - the same list headers recur across threads.
+    """
+    return tuple(address for _, address in getaddresses([to_header]) if address)
+
+
+def _decode_body_bytes(data: str) -> bytes:
+    """
+    Decode base64url-encoded body data to raw bytes.
+    
+    Translates to the standard alphabet and decodes with
+    binascii.a2b_base64 directly; the extra padding makes unpadded
+    input decode too.
+    """
+    return binascii.a2b_base64(data.encode("ascii").translate(_B64_TRANS) + b"==")
+
+
+@functools.lru_cache(maxsize=BODY_DECODE_CACHE_SIZE)
+def _decode_body_data(data: str) -> str:
+    """Decode base64url-encoded body data to text."""
+    return _decode_body_bytes(data).decode("utf-8", errors="replace")
+
+
+class _FastJsonModel(JsonModel):
+    """googleapiclient response model that parses JSON with orjson."""
+    
+    def deserialize(self, content):
+        try:
+            body = json_loads(content)
+        except ValueError:
+            # Same as JsonModel: hand back non-JSON bodies as text
+            return content.decode("utf-8") if isinstance(content, bytes) else content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
 
 class GmailService:
     """
@@ -52,6 +218,18 @@ class GmailService:
         self._service = None
         self._credentials: Optional[Credentials] = None
         self._authenticated = False
+        # token.json mtime the current service was built from
+        self._token_mtime: Optional[float] = None
+        # Serializes authenticate() across worker threads
+        self._auth_lock = threading.Lock()
+        # (monotonic time, result) of the last check_connection API probe
+        self._last_check: Optional[Tuple[float, Dict[str, Any]]] = None
+        # Held while a background connection re-check is running
+        self._check_lock = threading.Lock()
+        # message_id -> (monotonic fetch time, parsed full message), LRU order
+        self._message_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Per-thread authorized HTTP connections (httplib2 is not thread-safe)
+        self._local = threading.local()
         
         logger.info(f"GmailService initialized (credentials: {self._credentials_path})")
     
@@ -64,17 +242,38 @@ class GmailService:
         2. If token exists but expired, refresh it
         3. If no token, run OAuth flow (opens browser)
         
+        Returns early if already authenticated with still-valid credentials
+        and token.json has not changed since.
+        
         Returns:
             True if authentication successful
             
         Raises:
             FileNotFoundError: If credentials.json is missing
         """
-        # Check for existing token
-        if os.path.exists(self._token_path):
+        with self._auth_lock:
+            if (
+                self.is_authenticated()
+                and self._credentials.valid
+                and self._get_token_mtime() == self._token_mtime
+            ):
+                return True
+            
+            return self._authenticate()
+    
+    def _authenticate(self) -> bool:
+        """Load or create credentials and build the Gmail service (lock held)."""
+        # Check for existing token (one open, no separate exists check)
+        try:
+            with open(self._token_path, "rb") as token_file:
+                token_info = json_loads(token_file.read())
+        except FileNotFoundError:
+            token_info = None
+        
+        if token_info is not None:
             logger.info("Found existing token, loading...")
-            self._credentials = Credentials.from_authorized_user_file(
-                self._token_path, SCOPES
+            self._credentials = Credentials.from_authorized_user_info(
+                token_info, SCOPES
             )
         
         # Check if credentials need refresh or creation
@@ -99,17 +298,50 @@ class GmailService:
                 self._credentials = flow.run_local_server(port=0)
             
             # Save token for future use
-            with open(self._token_path, "w") as token_file:
-                token_file.write(self._credentials.to_json())
-            logger.info(f"Token saved to {self._token_path}")
+            self._save_token()
         
         # Build Gmail service
-        self._service = build("gmail", "v1", credentials=self._credentials)
+        # Requests run over the per-thread connections from _thread_http, and
+        # the discovery document ships with googleapiclient (no cache lookup)
+        self._service = build(
+            "gmail", "v1",
+            credentials=self._credentials,
+            cache_discovery=False,
+            model=_FastJsonModel()
+        )
         self._authenticated = True
+        self._token_mtime = self._get_token_mtime()
         logger.info("Gmail authentication successful")
         
         return True
     
+    def _save_token(self) -> None:
+        """
+        Write the credentials to token.json if they changed.
+        
+        Written to a temporary file and renamed into place, so concurrent
+        readers never see a half-written token.
+        """
+        token = self._credentials.to_json().encode("utf-8")
+        token_path = Path(self._token_path)
+        try:
+            if token_path.read_bytes() == token:
+                return
+        except FileNotFoundError:
+            pass
+        
+        tmp_path = token_path.with_name(token_path.name + ".tmp")
+        tmp_path.write_bytes(token)
+        os.replace(tmp_path, token_path)
+        logger.info(f"Token saved to {self._token_path}")
+    
+    def _get_token_mtime(self) -> Optional[float]:
+        """Modification time of token.json (None if missing)."""
+        try:
+            return os.stat(self._token_path).st_mtime
+        except OSError:
+            return None
+    
     def is_authenticated(self) -> bool:
         """Check if service is currently authenticated."""
         return self._authenticated and self._service is not None
@@ -119,27 +351,61 @@ class GmailService:
         if not self.is_authenticated():
             self.authenticate()
     
-    async def get_message(self, message_id: str) -> Optional[Dict[str, Any]]:
+    def _thread_http(self) -> AuthorizedHttp:
+        """Authorized HTTP connection owned by the calling thread."""
+        http = getattr(self._local, "http", None)
+        if http is None or http.credentials is not self._credentials:
+            http = AuthorizedHttp(
+                self._credentials,
+                http=httplib2.Http(timeout=GMAIL_HTTP_TIMEOUT)
+            )
+            self._local.http = http
+        return http
+    
+    async def _execute(self, request: Any) -> Any:
+        """
+        Execute a Gmail API request (or batch) in a worker thread.
+        
+        googleapiclient is synchronous; running it off the event loop lets
+        concurrent ingestion overlap Gmail round-trips instead of blocking.
+        """
+        return await asyncio.to_thread(lambda: request.execute(http=self._thread_http()))
+    
+    async def get_message(
+        self,
+        message_id: str,
+        include_body: bool = True
+    ) -> Optional[Dict[str, Any]]:
         """
         Fetch a single email message by ID.
         
+        Full messages are served from an in-memory LRU cache when fetched
+        within the last MESSAGE_CACHE_TTL_SECONDS.
+        
         Args:
             message_id: The Gmail message ID
+            include_body: False fetches headers only (body is empty), which
+                          skips downloading the MIME tree and attachments
             
         Returns:
             Parsed message dict with id, thread_id, subject, sender,
             recipients, date, body, and labels. Returns None if not found.
         """
+        cached = self._cached_message(message_id)
+        if cached is not None:
+            return cached
+        
         self._ensure_authenticated()
         
         try:
-            message = self._service.users().messages().get(
-                userId="me",
-                id=message_id,
-                format="full"
-            ).execute()
+            message = await self._execute(
+                self._message_request(message_id, include_body)
+            )
             
-            return self._parse_message(message)
+            parsed = self._parse_message(message)
+            if include_body:
+                self._cache_message(parsed)
+            return parsed
             
         except HttpError as e:
             logger.error(f"Failed to fetch message {message_id}: {e}")
@@ -147,6 +413,165 @@ class GmailService:
                 return None
             raise
     
+    async def get_messages_batch(
+        self,
+        message_ids: List[str],
+        include_body: bool = True
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch multiple email messages using Gmail batch HTTP requests.
+        
+        Queues up to GMAIL_BATCH_SIZE messages.get calls per batch, so
+        N messages cost ceil(N/GMAIL_BATCH_SIZE) round trips instead of N.
+        Calls that failed inside a batch (rate limits, server errors) are
+        re-fetched one by one with get_message.
+        
+        Args:
+            message_ids: List of Gmail message IDs
+            include_body: False fetches headers only (see get_message)
+        
+        Returns:
+            Dict mapping message ID to parsed message dict.
+            Messages that do not exist map to None.
+        
+        Raises:
+            HttpError: If a message still fails when fetched on its own
+        """
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        to_fetch = []
+        for message_id in message_ids:
+            cached = self._cached_message(message_id)
+            if cached is not None:
+                results[message_id] = cached
+            else:
+                to_fetch.append(message_id)
+        
+        if not to_fetch:
+            return results
+        
+        self._ensure_authenticated()
+        
+        responses = await self._execute_batch({
+            message_id: self._message_request(message_id, include_body)
+            for message_id in to_fetch
+        })
+        
+        # MIME walking and body decoding is CPU work - keep it off the event loop
+        parsed = await asyncio.to_thread(lambda: {
+            message_id: self._parse_message(response) if response is not None else None
+            for message_id, response in responses.items()
+        })
+        
+        if include_body:
+            for message in parsed.values():
+                if message is not None:
+                    self._cache_message(message)
+        results.update(parsed)
+        
+        failed = [message_id for message_id in to_fetch if message_id not in responses]
+        if failed:
+            results.update(await self._refetch(
+                failed,
+                functools.partial(self.get_message, include_body=include_body)
+            ))
+        return results
+    
+    def _cached_message(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Cached full message (shallow copy), or None if missing or expired."""
+        entry = self._message_cache.get(message_id)
+        if entry is None:
+            return None
+        
+        fetched_at, message = entry
+        if time.monotonic() - fetched_at >= MESSAGE_CACHE_TTL_SECONDS:
+            del self._message_cache[message_id]
+            return None
+        
+        self._message_cache.move_to_end(message_id)
+        return dict(message)
+    
+    def _cache_message(self, message: Dict[str, Any]) -> None:
+        """Store a parsed full message, evicting the least recently used."""
+        self._message_cache[message["id"]] = (time.monotonic(), message)
+        self._message_cache.move_to_end(message["id"])
+        while len(self._message_cache) > MESSAGE_CACHE_SIZE:
+            self._message_cache.popitem(last=False)
+    
+    def _message_request(self, message_id: str, include_body: bool) -> Any:
+        """Build an unexecuted messages.get request, full or headers only."""
+        messages = self._service.users().messages()
+        if include_body:
+            return messages.get(userId="me", id=message_id, format="full")
+        return messages.get(
+            userId="me",
+            id=message_id,
+            format="metadata",
+            fields=METADATA_FIELDS
+        )
+    
+    async def _execute_batch(self, requests: Dict[str, Any]) -> Dict[str, Optional[Dict]]:
+        """
+        Execute Gmail API requests as batch HTTP requests.
+        
+        Sends up to GMAIL_BATCH_SIZE calls per HTTP round trip.
+        
+        Args:
+            requests: Dict mapping a unique request ID to an unexecuted request
+        
+        Returns:
+            Dict mapping request ID to its raw response (None if not
+            found). Requests that failed for any other reason (e.g. 429
+            rateLimitExceeded, 5xx) are left out, for the caller to retry.
+        """
+        responses: Dict[str, Optional[Dict]] = {}
+        
+        def _on_response(request_id, response, exception):
+            if exception is None:
+                responses[request_id] = response
+            elif isinstance(exception, HttpError) and exception.resp.status == 404:
+                responses[request_id] = None
+            else:
+                logger.warning(f"Gmail batch request {request_id} failed: {exception}")
+        
+        request_ids = list(requests)
+        for start in range(0, len(request_ids), GMAIL_BATCH_SIZE):
+            batch = self._service.new_batch_http_request(callback=_on_response)
+            for request_id in request_ids[start:start + GMAIL_BATCH_SIZE]:
+                batch.add(requests[request_id], request_id=request_id)
+            await self._execute(batch)
+        
+        return responses
+    
+    async def _refetch(
+        self,
+        item_ids: List[str],
+        fetch: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        concurrency: int = GMAIL_REFETCH_CONCURRENCY
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch items one by one after their calls failed inside a batch.
+        
+        Args:
+            item_ids: IDs to fetch
+            fetch: Single-item fetch (e.g. get_message), None if not found
+            concurrency: Maximum fetches in flight at once
+        
+        Returns:
+            Dict mapping ID to the fetch result
+        
+        Raises:
+            HttpError: If a fetch fails for a reason other than not found
+        """
+        logger.info(f"Re-fetching {len(item_ids)} Gmail items that failed in a batch")
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _fetch(item_id: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await fetch(item_id)
+        
+        fetched = await asyncio.gather(*[_fetch(item_id) for item_id in item_ids])
+        return dict(zip(item_ids, fetched))
+    
     async def get_thread(self, thread_id: str) -> Optional[Dict[str, Any]]:
         """
         Fetch an entire email thread (conversation).
@@ -160,24 +585,16 @@ class GmailService:
         self._ensure_authenticated()
         
         try:
-            thread = self._service.users().threads().get(
-                userId="me",
-                id=thread_id,
-                format="full"
-            ).execute()
-            
-            messages = []
-            for msg in thread.get("messages", []):
-                parsed = self._parse_message(msg)
-                if parsed:
-                    messages.append(parsed)
+            thread = await self._execute(
+                self._service.users().threads().get(
+                    userId="me",
+                    id=thread_id,
+                    format="full"
+                )
+            )
             
-            return {
-                "thread_id": thread_id,
-                "message_count": len(messages),
-                "messages": messages,
-                "combined_text": self._combine_thread_text(messages)
-            }
+            # Parsing a long thread is CPU work - keep it off the event loop
+            return await asyncio.to_thread(self._build_thread, thread_id, thread)
             
         except HttpError as e:
             logger.error(f"Failed to fetch thread {thread_id}: {e}")
@@ -185,6 +602,72 @@ class GmailService:
                 return None
             raise
     
+    async def get_threads(
+        self,
+        thread_ids: List[str],
+        concurrency: int = 10
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch multiple email threads.
+        
+        Tries Gmail batch HTTP requests first. Threads whose call failed
+        inside a batch, or all of them if a batch request itself fails,
+        are fetched with concurrent get_thread calls, at most concurrency
+        in flight at once.
+        
+        Args:
+            thread_ids: List of Gmail thread IDs
+            concurrency: Maximum concurrent requests in the fallback path
+        
+        Returns:
+            Dict mapping thread ID to the thread dict (as returned by
+            get_thread). Threads that do not exist map to None.
+        
+        Raises:
+            HttpError: If a thread still fails when fetched on its own
+        """
+        self._ensure_authenticated()
+        
+        thread_ids = list(dict.fromkeys(thread_ids))
+        
+        try:
+            responses = await self._execute_batch({
+                thread_id: self._service.users().threads().get(
+                    userId="me",
+                    id=thread_id,
+                    format="full"
+                )
+                for thread_id in thread_ids
+            })
+        except HttpError as e:
+            logger.warning(f"Batch thread fetch failed, fetching threads concurrently: {e}")
+            responses = {}
+        
+        threads = await asyncio.to_thread(lambda: {
+            thread_id: self._build_thread(thread_id, response) if response is not None else None
+            for thread_id, response in responses.items()
+        })
+        
+        failed = [thread_id for thread_id in thread_ids if thread_id not in responses]
+        if failed:
+            threads.update(await self._refetch(failed, self.get_thread, concurrency))
+        return threads
+    
+    def _build_thread(self, thread_id: str, thread: Dict) -> Dict[str, Any]:
+        """Parse a raw Gmail thread resource into the thread dict."""
+        messages = []
+        for msg in thread.get("messages", []):
+            parsed = self._parse_message(msg)
+            if parsed:
+                messages.append(parsed)
+        
+        return {
+            "thread_id": thread_id,
+            "message_count": len(messages),
+            "messages": messages,
+            "combined_text": self._combine_thread_text(messages)
+        }
+    
     async def search_messages(
         self, 
         query: str, 
@@ -203,29 +686,37 @@ class GmailService:
         self._ensure_authenticated()
         
         try:
-            results = self._service.users().messages().list(
-                userId="me",
-                q=query,
-                maxResults=max_results
-            ).execute()
+            results = await self._execute(
+                self._service.users().messages().list(
+                    userId="me",
+                    q=query,
+                    maxResults=max_results
+                )
+            )
             
             messages = results.get("messages", [])
             
-            # Fetch metadata for each message
+            # Fetch metadata for all messages in batched requests
+            # (metadata only - faster than full)
+            metadata = await self._execute_batch({
+                msg["id"]: self._search_metadata_request(msg["id"])
+                for msg in messages
+            })
+            
+            # Parts that failed in the batch (e.g. rate limited) are
+            # fetched again one by one rather than dropped from the results
+            failed = [msg["id"] for msg in messages if msg["id"] not in metadata]
+            if failed:
+                metadata.update(await self._refetch(failed, self._get_search_metadata))
+            
             parsed_results = []
             for msg in messages:
-                # Get message with metadata only (faster than full)
-                message = self._service.users().messages().get(
-                    userId="me",
-                    id=msg["id"],
-                    format="metadata",
-                    metadataHeaders=["Subject", "From", "To", "Date"]
-                ).execute()
+                message = metadata.get(msg["id"])
+                if message is None:
+                    # Deleted between the list and the metadata fetch
+                    continue
                 
-                headers = {
-                    h["name"]: h["value"] 
-                    for h in message.get("payload", {}).get("headers", [])
-                }
+                headers = _extract_headers(message.get("payload", {}), lower=False)
                 
                 parsed_results.append({
                     "id": message["id"],
@@ -242,6 +733,24 @@ class GmailService:
             logger.error(f"Search failed for query '{query}': {e}")
             raise
     
+    def _search_metadata_request(self, message_id: str) -> Any:
+        """Build an unexecuted messages.get request for a search result summary."""
+        return self._service.users().messages().get(
+            userId="me",
+            id=message_id,
+            format="metadata",
+            metadataHeaders=["Subject", "From", "To", "Date"]
+        )
+    
+    async def _get_search_metadata(self, message_id: str) -> Optional[Dict]:
+        """Fetch a search result's raw metadata on its own (None if not found)."""
+        try:
+            return await self._execute(self._search_metadata_request(message_id))
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
+    
     def _parse_message(self, message: Dict) -> Dict[str, Any]:
         """
         Parse raw Gmail API message into structured format.
@@ -251,9 +760,7 @@ class GmailService:
         - Plain text body (from MIME parts)
         - Labels
         """
-        headers = {}
-        for header in message.get("payload", {}).get("headers", []):
-            headers[header["name"].lower()] = header["value"]
+        headers = _extract_headers(message.get("payload", {}))
         
         # Parse date to datetime
         date_str = headers.get("date")
@@ -261,7 +768,7 @@ class GmailService:
         if date_str:
             try:
                 # Parse email date format
-                parsed_date = email.utils.parsedate_to_datetime(date_str)
+                parsed_date = _parse_email_date(date_str)
             except (ValueError, TypeError):
                 logger.warning(f"Failed to parse date: {date_str}")
         
@@ -269,11 +776,8 @@ class GmailService:
         body = self._extract_body(message.get("payload", {}))
         
         # Parse recipients
-        recipients = []
-        to_header = headers.get("to", "")
-        if to_header:
-            # Simple split - could be more robust for complex To headers
-            recipients = [r.strip() for r in to_header.split(",")]
+        to_header = headers.get("to")
+        recipients = list(_parse_recipients(to_header)) if to_header else []
         
         return {
             "id": message["id"],
@@ -287,6 +791,46 @@ class GmailService:
             "snippet": message.get("snippet", "")
         }
     
+    def parse_messages_soa(self, messages: List[Dict]) -> Dict[str, Any]:
+        """
+        Parse the addressing headers of many raw Gmail messages into columns.
+        
+        Recipients use a CSR layout: message i's recipients are
+        recipients_flat[recipients_offsets[i]:recipients_offsets[i + 1]],
+        so consumers can process all recipients in one flat pass.
+        
+        Args:
+            messages: Raw Gmail API message resources (full or metadata format)
+        
+        Returns:
+            Dict with ids, thread_ids, senders, recipients_flat (lists) and
+            recipients_offsets (int32 array of length len(messages) + 1)
+        """
+        ids = []
+        thread_ids = []
+        senders = []
+        recipients_flat: List[str] = []
+        offsets = np.zeros(len(messages) + 1, dtype=np.int32)
+        
+        for i, message in enumerate(messages):
+            headers = _extract_headers(message.get("payload", {}))
+            ids.append(message["id"])
+            thread_ids.append(message["threadId"])
+            senders.append(headers.get("from"))
+            
+            to_header = headers.get("to")
+            if to_header:
+                recipients_flat.extend(_parse_recipients(to_header))
+            offsets[i + 1] = len(recipients_flat)
+        
+        return {
+            "ids": ids,
+            "thread_ids": thread_ids,
+            "senders": senders,
+            "recipients_flat": recipients_flat,
+            "recipients_offsets": offsets
+        }
+    
     def _extract_body(self, payload: Dict) -> str:
         """
         Extract plain text body from email payload.
@@ -294,53 +838,51 @@ class GmailService:
         Handles multipart messages by finding text/plain parts.
         Falls back to text/html if no plain text available.
         """
-        body_text = ""
-        
-        # Check for direct body data
+        # Single-part message: the body is on the payload itself
         if "body" in payload and "data" in payload["body"]:
-            body_data = payload["body"]["data"]
-            body_text = self._decode_base64(body_data)
+            return self._decode_base64(payload["body"]["data"]).strip()
         
-        # Check for multipart message
-        elif "parts" in payload:
-            for part in payload["parts"]:
-                mime_type = part.get("mimeType", "")
-                
-                # Prefer text/plain
-                if mime_type == "text/plain":
-                    if "body" in part and "data" in part["body"]:
-                        body_text = self._decode_base64(part["body"]["data"])
-                        break
+        # Multipart: depth-first walk (in part order) for the first
+        # text/plain part, remembering the first text/html one
+        html_data = None
+        stack = list(reversed(payload.get("parts", [])))
+        while stack:
+            part = stack.pop()
+            data = part.get("body", {}).get("data")
+            mime_type = part.get("mimeType", "")
+        
+            if mime_type == "text/plain" and data:
+                body_text = self._decode_base64(data).strip()
+                if body_text:
+                    return body_text
+            elif mime_type == "text/html" and data and html_data is None:
+                html_data = data
+            elif "parts" in part:
+                stack.extend(reversed(part["parts"]))
                 
-                # Recurse into nested multipart
-                elif mime_type.startswith("multipart/"):
-                    body_text = self._extract_body(part)
-                    if body_text:
-                        break
-            
-            # Fall back to text/html if no plain text
-            if not body_text:
-                for part in payload["parts"]:
-                    if part.get("mimeType") == "text/html":
-                        if "body" in part and "data" in part["body"]:
-                            body_text = self._decode_base64(part["body"]["data"])
-                            # Strip HTML tags (basic cleanup)
-                            import re
-                            body_text = re.sub(r"<[^>]+>", "", body_text)
-                            break
-        
-        return body_text.strip()
+        # Fall back to text/html if no plain text
+        if html_data is None:
+            return ""
+        # Tags are stripped from the raw bytes, decoding to text only once
+        return _html_to_text(self._decode_base64_bytes(html_data)).strip()
     
     def _decode_base64(self, data: str) -> str:
         """Decode base64url-encoded email body data."""
         try:
             # Gmail uses URL-safe base64
-            decoded = base64.urlsafe_b64decode(data)
-            return decoded.decode("utf-8", errors="replace")
+            return _decode_body_data(data)
         except Exception as e:
             logger.error(f"Failed to decode body: {e}")
             return ""
     
+    def _decode_base64_bytes(self, data: str) -> bytes:
+        """Decode base64url-encoded email body data without text decoding."""
+        try:
+            return _decode_body_bytes(data)
+        except Exception as e:
+            logger.error(f"Failed to decode body: {e}")
+            return b""
+    
     def _combine_thread_text(self, messages: List[Dict]) -> str:
         """
         Combine all messages in a thread into a single text block.
@@ -348,30 +890,61 @@ class GmailService:
         Formats each message with From/Date headers, useful for
         LLM processing of entire conversations.
         """
-        combined = []
+        # Bodies are written straight into the buffer rather than copied
+        # into a per-message string first
+        combined = io.StringIO()
         
-        for msg in messages:
-            date_str = ""
-            if msg.get("date"):
-                date_str = msg["date"].isoformat() if isinstance(msg["date"], datetime) else str(msg["date"])
-            
-            combined.append(
+        for i, msg in enumerate(messages):
+            if i:
+                combined.write("\n")
+            combined.write(
                 f"From: {msg.get('sender', 'Unknown')}\n"
-                f"Date: {date_str}\n"
-                f"Subject: {msg.get('subject', '')}\n"
-                f"\n{msg.get('body', '')}\n"
-                f"\n---\n"
+                f"Date: {_format_message_date(msg.get('date'))}\n"
+                f"Subject: {msg.get('subject', '')}\n\n"
             )
-        
-        return "\n".join(combined)
+            combined.write(msg.get("body", ""))
+            combined.write("\n\n---\n")
+            
+        return combined.getvalue()
     
     def check_connection(self) -> Dict[str, Any]:
         """
         Check Gmail connection status.
         
+        The getProfile probe result is reused for CONNECTION_CHECK_TTL_SECONDS.
+        After that the stale result is still returned immediately while a
+        background thread re-checks, so status polling never waits on Gmail
+        after the first check.
+        
         Returns:
             Dict with connection status and details
         """
+        cached = self._last_check
+        if cached is None:
+            return self._check_connection()
+        
+        checked_at, result = cached
+        if time.monotonic() - checked_at >= CONNECTION_CHECK_TTL_SECONDS:
+            self._refresh_check_in_background()
+        return dict(result)
+    
+    def _refresh_check_in_background(self) -> None:
+        """Start a background re-check unless one is already running."""
+        if not self._check_lock.acquire(blocking=False):
+            return
+        
+        def _run():
+            try:
+                self._check_connection()
+            except Exception as e:
+                logger.warning(f"Background Gmail connection check failed: {e}")
+            finally:
+                self._check_lock.release()
+        
+        threading.Thread(target=_run, daemon=True).start()
+    
+    def _check_connection(self) -> Dict[str, Any]:
+        """Check the connection now, caching the result if Gmail was probed."""
         result = {
             "connected": False,
             "credentials_exist": os.path.exists(self._credentials_path),
@@ -382,21 +955,24 @@ class GmailService:
         
         if not result["credentials_exist"]:
             result["message"] = "credentials.json not found"
+            self._last_check = None
             return result
         
         if not result["token_exists"]:
             result["message"] = "Not authenticated - OAuth required"
+            self._last_check = None
             return result
         
         try:
             self.authenticate()
             # Try a simple API call to verify connection
-            self._service.users().getProfile(userId="me").execute()
+            self._service.users().getProfile(userId="me").execute(http=self._thread_http())
             result["connected"] = True
             result["message"] = "Connected to Gmail"
         except Exception as e:
             result["message"] = f"Connection failed: {str(e)}"
         
+        self._last_check = (time.monotonic(), dict(result))
         return result
 
 
@@ -4,36 +4,192 @@ Graph Operations - Neo4j Read/Write Operations
 Provides functions for saving decision traces to the graph database
 and querying for precedents, patterns, and analytics.
 """
+import os
+import copy
+import time
 import uuid
 import logging
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
+
+import numpy as np
 
 from .neo4j_service import neo4j_service
 from .models import DecisionTrace, Precedent
+from .embedding_store import EmbeddingStore
 
 logger = logging.getLogger(__name__)
 
+# Embeddings of precedent summaries, keyed by decision id. Decision traces
+# are immutable, so an id's summary (and embedding) never changes.
+_precedent_embeddings = EmbeddingStore(max_size=10000)
+
+# .npz file the precedent embeddings are saved to on shutdown and loaded
+# from at startup, so a restart does not re-embed every precedent
+# (empty = in-memory only)
+PRECEDENT_EMBEDDINGS_PATH = os.getenv("PRECEDENT_EMBEDDINGS_PATH", "")
+
+
+def load_precedent_embeddings() -> None:
+    """Load persisted precedent embeddings, if PRECEDENT_EMBEDDINGS_PATH is set."""
+    if not PRECEDENT_EMBEDDINGS_PATH:
+        return
+    try:
+        count = _precedent_embeddings.load(PRECEDENT_EMBEDDINGS_PATH)
+        logger.info(f"Loaded {count} precedent embeddings from {PRECEDENT_EMBEDDINGS_PATH}")
+    except Exception as e:
+        logger.error(f"Failed to load precedent embeddings: {e}")
+
+
+def save_precedent_embeddings() -> None:
+    """Persist precedent embeddings, if PRECEDENT_EMBEDDINGS_PATH is set."""
+    if not PRECEDENT_EMBEDDINGS_PATH:
+        return
+    try:
+        _precedent_embeddings.save(PRECEDENT_EMBEDDINGS_PATH)
+        logger.info(f"Saved {len(_precedent_embeddings)} precedent embeddings")
+    except Exception as e:
+        logger.error(f"Failed to save precedent embeddings: {e}")
+
+
+# Decisions returned by get_decision_by_id, most recently used last.
+# Traces are immutable once saved; only the customer node they link to
+# changes, so entries for a customer are dropped when it gets a new save.
+DECISION_CACHE_SIZE = 1024
+_decision_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+# Rule-based precedent results: (industry, arr, type, limit) ->
+# (monotonic time, precedents). Cleared on every save, since a new
+# decision can be a precedent.
+PRECEDENT_CACHE_TTL_SECONDS = 60
+PRECEDENT_CACHE_SIZE = 256
+_precedent_cache: Dict[Tuple, Tuple[float, List[Precedent]]] = {}
+
+# Rule-based precedent window and scoring
+PRECEDENT_LOOKBACK_DAYS = 90
+PRECEDENT_ARR_TOLERANCE = 0.2
+# Score of a rule-based match with no ARR closeness to add (ARR closeness
+# lifts it toward 1.0)
+PRECEDENT_BASE_SCORE = 0.5
+
 
 # =============================================================================
 # WRITE OPERATIONS
 # =============================================================================
 
+# Whole decision trace in one statement: the Decision node is created
+# first and stays bound (via WITH) while the Person, Customer, Policy and
+# Evidence nodes are merged/created and linked to it. Optional parts are
+# driven by (possibly empty) list parameters through FOREACH, so one
+# statement text covers every trace shape. The SIMILAR_TO edges come last:
+# their UNWIND + MATCH may produce no rows, after which nothing else runs.
+SAVE_TRACE_CYPHER = """
+CREATE (d:Decision {
+    id: $decision.id,
+    timestamp: datetime($decision.timestamp),
+    type: $decision.type,
+    outcome: $decision.outcome,
+    customer_name: $decision.customer_name,
+    customer_industry: $decision.customer_industry,
+    customer_arr: $decision.customer_arr,
+    requested_action: $decision.requested_action,
+    requestor_email: $decision.requestor_email,
+    requested_at: datetime($decision.requested_at),
+    request_reason: $decision.request_reason,
+    final_action: $decision.final_action,
+    decision_maker_email: $decision.decision_maker_email,
+    decided_at: datetime($decision.decided_at),
+    decision_reasoning: $decision.decision_reasoning,
+    source: $decision.source,
+    created_at: datetime($decision.created_at)
+})
+
+FOREACH (person IN $requestors |
+    MERGE (p:Person {email: person.email})
+    ON CREATE SET p.role = person.role, p.name = person.name, p.created_at = datetime($now)
+    CREATE (d)-[:REQUESTED_BY]->(p)
+)
+FOREACH (person IN $approvers |
+    MERGE (p:Person {email: person.email})
+    ON CREATE SET p.role = person.role, p.name = person.name, p.created_at = datetime($now)
+    CREATE (d)-[:APPROVED_BY {
+        approved_at: datetime(person.approved_at),
+        notes: person.notes
+    }]->(p)
+)
+
+FOREACH (evidence IN $evidence |
+    CREATE (e:Evidence {
+        id: evidence.id,
+        source: evidence.source,
+        field: evidence.field,
+        value: evidence.value,
+        captured_at: datetime(evidence.captured_at),
+        decision_id: $decision.id
+    })
+    CREATE (d)-[:BASED_ON]->(e)
+)
+
+FOREACH (policy IN $policies |
+    MERGE (p:Policy {version: policy.version})
+    ON CREATE SET
+        p.effective_from = datetime(policy.effective_from),
+        p.effective_until = CASE WHEN policy.effective_until IS NOT NULL
+                                 THEN datetime(policy.effective_until)
+                                 ELSE null END,
+        p.standard_limit = policy.standard_limit,
+        p.manager_limit = policy.manager_limit,
+        p.vp_limit = policy.vp_limit,
+        p.description = policy.description
+    CREATE (d)-[:EVALUATED {followed: policy.followed}]->(p)
+    FOREACH (override IN $exceptions |
+        CREATE (d)-[:OVERRODE {
+            exception_type: override.exception_type,
+            justification: override.justification,
+            deviation: override.deviation
+        }]->(p)
+    )
+)
+
+MERGE (c:Customer {name: $customer.name})
+ON CREATE SET
+    c.industry = $customer.industry,
+    c.current_arr = $customer.current_arr,
+    c.tier = $customer.tier,
+    c.first_seen = datetime($now),
+    c.last_decision = datetime($customer.timestamp)
+ON MATCH SET
+    c.current_arr = COALESCE($customer.current_arr, c.current_arr),
+    c.last_decision = datetime($customer.timestamp)
+CREATE (d)-[:FOR_CUSTOMER]->(c)
+
+WITH d
+UNWIND $precedents AS precedent
+MATCH (other:Decision {id: precedent.id})
+CREATE (d)-[:SIMILAR_TO {
+    similarity_score: precedent.similarity_score,
+    calculated_at: datetime($now),
+    reason: precedent.reason
+}]->(other)
+"""
+
+
 async def save_decision_trace(trace: DecisionTrace) -> bool:
     """
     Save complete decision trace to Neo4j graph.
     
-    Creates:
+    Creates, in a single Cypher statement (one round trip):
     - Decision node with all properties
     - Person nodes (requestor, approver)
     - Evidence nodes for each piece of evidence
     - Policy node (if applicable)
     - Customer node
-    - All relationships between nodes
+    - All relationships between nodes, including SIMILAR_TO precedents
     
     Args:
         trace: Complete DecisionTrace to save
-        
+    
     Returns:
         bool: True if successful, False otherwise
     """
@@ -42,32 +198,14 @@ async def save_decision_trace(trace: DecisionTrace) -> bool:
         return False
     
     try:
-        with neo4j_service.get_session() as session:
+        params = _save_trace_params(trace)
+        async with neo4j_service.async_session() as session:
             # Use transaction for atomicity
-            with session.begin_transaction() as tx:
-                # 1. Create Decision node
-                _create_decision_node(tx, trace)
-                
-                # 2. Create Person nodes (requestor and approver)
-                _create_person_nodes(tx, trace)
-                
-                # 3. Create Evidence nodes
-                _create_evidence_nodes(tx, trace)
-                
-                # 4. Create Policy node
-                _create_policy_node(tx, trace)
-                
-                # 5. Create Customer node
-                _create_customer_node(tx, trace)
-                
-                # 6. Create relationships
-                _create_relationships(tx, trace)
-                
-                # 7. Create similarity relationships to precedents
-                _create_similarity_relationships(tx, trace)
-                
-                tx.commit()
+            async with await session.begin_transaction() as tx:
+                await tx.run(SAVE_TRACE_CYPHER, params)
+                await tx.commit()
         
+        _invalidate_read_caches(trace.request.customer)
         logger.info(f"Saved decision trace to Neo4j: {trace.decision_id}")
         return True
     
@@ -76,340 +214,311 @@ async def save_decision_trace(trace: DecisionTrace) -> bool:
         return False
 
 
-def _create_decision_node(tx, trace: DecisionTrace):
-    """Create the main Decision node."""
-    # Extract customer data from evidence
-    customer_industry = None
-    customer_arr = None
-    for evidence in trace.evidence:
-        if evidence.field == "industry":
-            customer_industry = evidence.value
-        elif evidence.field == "arr":
-            customer_arr = evidence.value
-    
-    query = """
-    CREATE (d:Decision {
-        id: $id,
-        timestamp: datetime($timestamp),
-        type: $type,
-        outcome: $outcome,
-        customer_name: $customer_name,
-        customer_industry: $customer_industry,
-        customer_arr: $customer_arr,
-        requested_action: $requested_action,
-        requestor_email: $requestor_email,
-        requested_at: datetime($requested_at),
-        request_reason: $request_reason,
-        final_action: $final_action,
-        decision_maker_email: $decision_maker_email,
-        decided_at: datetime($decided_at),
-        decision_reasoning: $decision_reasoning,
-        source: $source,
-        created_at: datetime($created_at)
-    })
-    """
-    
-    tx.run(query, {
-        "id": trace.decision_id,
-        "timestamp": trace.timestamp.isoformat(),
-        "type": trace.decision_type.value,
-        "outcome": trace.decision.outcome.value,
-        "customer_name": trace.request.customer,
-        "customer_industry": customer_industry,
-        "customer_arr": customer_arr,
-        "requested_action": trace.request.requested_action,
-        "requestor_email": str(trace.request.requestor_email) if trace.request.requestor_email else None,
-        "requested_at": (trace.request.requested_at or trace.timestamp).isoformat(),
-        "request_reason": trace.request.reason or "",
-        "final_action": trace.decision.final_action,
-        "decision_maker_email": str(trace.decision.decision_maker_email) if trace.decision.decision_maker_email else None,
-        "decided_at": (trace.decision.decided_at or trace.timestamp).isoformat(),
-        "decision_reasoning": trace.decision.reasoning or "",
-        "source": trace.source,
-        "created_at": trace.timestamp.isoformat()
-    })
+def _invalidate_read_caches(customer_name: str) -> None:
+    """Drop cached reads a newly saved trace for customer_name can change."""
+    _precedent_cache.clear()
+    stale = [
+        decision_id for decision_id, decision in _decision_cache.items()
+        if decision.get("customer_name") == customer_name
+    ]
+    for decision_id in stale:
+        del _decision_cache[decision_id]
 
 
-def _create_person_nodes(tx, trace: DecisionTrace):
-    """Create Person nodes for requestor and approver (MERGE = create if not exists)."""
-    # Requestor
-    if trace.request.requestor_email:
-        tx.run("""
-            MERGE (p:Person {email: $email})
-            ON CREATE SET p.role = $role, p.name = $name, p.created_at = datetime()
-        """, {
-            "email": str(trace.request.requestor_email),
+def _save_trace_params(trace: DecisionTrace) -> Dict[str, Any]:
+    """Build the SAVE_TRACE_CYPHER parameters for a decision trace."""
+    # Customer data from evidence (one pass, shared by Decision and Customer)
+    evidence_by_field = {evidence.field: evidence.value for evidence in trace.evidence}
+    
+    requestor_email = str(trace.request.requestor_email) if trace.request.requestor_email else None
+    approver_email = str(trace.decision.decision_maker_email) if trace.decision.decision_maker_email else None
+    decided_at = (trace.decision.decided_at or trace.timestamp).isoformat()
+    
+    requestors = []
+    if requestor_email:
+        requestors.append({
+            "email": requestor_email,
             "role": "Sales Rep",
             "name": trace.request.requestor_name or ""
         })
     
     # Decision maker (approver)
-    if trace.decision.decision_maker_email:
-        role = _infer_role_from_email(str(trace.decision.decision_maker_email))
-        tx.run("""
-            MERGE (p:Person {email: $email})
-            ON CREATE SET p.role = $role, p.name = $name, p.created_at = datetime()
-        """, {
-            "email": str(trace.decision.decision_maker_email),
-            "role": role,
-            "name": trace.decision.decision_maker_name or ""
+    approvers = []
+    if approver_email:
+        approvers.append({
+            "email": approver_email,
+            "role": _infer_role_from_email(approver_email),
+            "name": trace.decision.decision_maker_name or "",
+            "approved_at": decided_at,
+            "notes": trace.decision.reasoning or ""
+        })
+    
+    # Values go over Bolt as-is (str/int/float/bool), so booleans stay
+    # filterable in Cypher (e.value = true)
+    evidence = [
+        {
+            "id": f"evidence_{trace.decision_id}_{item.field}",
+            "source": item.source,
+            "field": item.field,
+            "value": item.value,
+            "captured_at": item.captured_at.isoformat()
+        }
+        for item in trace.evidence
+    ]
+    
+    policies = []
+    exceptions = []
+    if trace.policy:
+        discount_limits = trace.policy.rules.get("discount_limits", {})
+        policies.append({
+            "version": trace.policy.version,
+            "effective_from": trace.policy.effective_from.isoformat(),
+            "effective_until": trace.policy.effective_until.isoformat() if trace.policy.effective_until else None,
+            "standard_limit": str(discount_limits.get("standard_limit", 10)) + "%",
+            "manager_limit": str(discount_limits.get("manager_limit", 15)) + "%",
+            "vp_limit": str(discount_limits.get("vp_limit", 20)) + "%",
+            "description": f"Policy version {trace.policy.version}",
+            "followed": not trace.policy.exception_made
         })
+        # Decision -[:OVERRODE]-> Policy (if exceptions made)
+        exceptions = [
+            {
+                "exception_type": exception.exception_type,
+                "justification": exception.description,
+                "deviation": exception.deviation
+            }
+            for exception in trace.exceptions
+        ]
+    
+    return {
+        # One clock for the whole save (created_at, first_seen, calculated_at)
+        "now": trace.timestamp.isoformat(),
+        "decision": {
+            "id": trace.decision_id,
+            "timestamp": trace.timestamp.isoformat(),
+            "type": trace.decision_type.value,
+            "outcome": trace.decision.outcome.value,
+            "customer_name": trace.request.customer,
+            "customer_industry": evidence_by_field.get("industry"),
+            "customer_arr": evidence_by_field.get("arr"),
+            "requested_action": trace.request.requested_action,
+            "requestor_email": requestor_email,
+            "requested_at": (trace.request.requested_at or trace.timestamp).isoformat(),
+            "request_reason": trace.request.reason or "",
+            "final_action": trace.decision.final_action,
+            "decision_maker_email": approver_email,
+            "decided_at": decided_at,
+            "decision_reasoning": trace.decision.reasoning or "",
+            "source": trace.source,
+            "created_at": trace.timestamp.isoformat()
+        },
+        "requestors": requestors,
+        "approvers": approvers,
+        "evidence": evidence,
+        "policies": policies,
+        "exceptions": exceptions,
+        "customer": {
+            "name": trace.request.customer,
+            "industry": evidence_by_field.get("industry"),
+            "current_arr": evidence_by_field.get("arr"),
+            "tier": evidence_by_field.get("tier"),
+            "timestamp": trace.timestamp.isoformat()
+        },
+        "precedents": [
+            {
+                "id": precedent.decision_id,
+                "similarity_score": precedent.similarity_score,
+                "reason": precedent.why_similar or "Similar customer profile and decision context"
+            }
+            for precedent in trace.precedents
+        ]
+    }
+
+
+# Approver role keywords, checked in priority order
+_ROLE_KEYWORDS = (
+    ("manager", "Manager"),
+    ("vp", "VP"),
+    ("director", "VP"),
+    ("cfo", "CFO"),
+    ("ceo", "CFO"),
+)
 
 
 def _infer_role_from_email(email: str) -> str:
     """Infer role from email address (simple heuristic)."""
     email_lower = email.lower()
-    if "manager" in email_lower:
-        return "Manager"
-    elif "vp" in email_lower or "director" in email_lower:
-        return "VP"
-    elif "cfo" in email_lower or "ceo" in email_lower:
-        return "CFO"
-    else:
-        return "Manager"  # Default assumption for approvers
+    for keyword, role in _ROLE_KEYWORDS:
+        if keyword in email_lower:
+            return role
+    return "Manager"  # Default assumption for approvers
 
 
-def _create_evidence_nodes(tx, trace: DecisionTrace):
-    """Create Evidence nodes for each piece of evidence."""
-    for evidence in trace.evidence:
-        evidence_id = f"evidence_{trace.decision_id}_{evidence.field}"
-        
-        # Handle different value types
-        value = evidence.value
-        if isinstance(value, bool):
-            value = str(value)
-        
-        tx.run("""
-            CREATE (e:Evidence {
-                id: $id,
-                source: $source,
-                field: $field,
-                value: $value,
-                captured_at: datetime($captured_at),
-                decision_id: $decision_id
-            })
-        """, {
-            "id": evidence_id,
-            "source": evidence.source,
-            "field": evidence.field,
-            "value": value,
-            "captured_at": evidence.captured_at.isoformat(),
-            "decision_id": trace.decision_id
-        })
+# =============================================================================
+# READ OPERATIONS
+# =============================================================================
 
+# Related nodes come back as property maps, each list from its own pattern
+# comprehension (no evidence x precedent row product, no Node objects)
+GET_DECISION_CYPHER = """
+MATCH (d:Decision {id: $decision_id})
+RETURN d{.*} as decision,
+       head([(d)-[:APPROVED_BY]->(approver:Person) | approver{.*}]) as approver,
+       head([(d)-[:REQUESTED_BY]->(requestor:Person) | requestor{.*}]) as requestor,
+       head([(d)-[:EVALUATED]->(policy:Policy) | policy{.*}]) as policy,
+       head([(d)-[:FOR_CUSTOMER]->(customer:Customer) | customer{.*}]) as customer,
+       [(d)-[:BASED_ON]->(evidence:Evidence) | evidence{.*}] as evidence_list,
+       [(d)-[:SIMILAR_TO]->(precedent:Decision) | precedent{.*}] as precedent_list
+"""
 
-def _create_policy_node(tx, trace: DecisionTrace):
-    """Create Policy node (MERGE = create if not exists)."""
-    if not trace.policy:
-        return
-    
-    tx.run("""
-        MERGE (p:Policy {version: $version})
-        ON CREATE SET
-            p.effective_from = datetime($effective_from),
-            p.effective_until = CASE WHEN $effective_until IS NOT NULL 
-                                     THEN datetime($effective_until) 
-                                     ELSE null END,
-            p.standard_limit = $standard_limit,
-            p.manager_limit = $manager_limit,
-            p.vp_limit = $vp_limit,
-            p.description = $description
-    """, {
-        "version": trace.policy.version,
-        "effective_from": trace.policy.effective_from.isoformat(),
-        "effective_until": trace.policy.effective_until.isoformat() if trace.policy.effective_until else None,
-        "standard_limit": str(trace.policy.rules.get("discount_limits", {}).get("standard_limit", 10)) + "%",
-        "manager_limit": str(trace.policy.rules.get("discount_limits", {}).get("manager_limit", 15)) + "%",
-        "vp_limit": str(trace.policy.rules.get("discount_limits", {}).get("vp_limit", 20)) + "%",
-        "description": f"Policy version {trace.policy.version}"
-    })
+# Candidates for semantic precedent matching (limit 10 instead of 20 to
+# save embedding calls)
+SEMANTIC_CANDIDATES_CYPHER = """
+MATCH (d:Decision)
+WHERE d.type = $type
+RETURN d.id as decision_id,
+       d.customer_name as customer,
+       d.customer_industry as industry,
+       d.customer_arr as arr,
+       d.final_action as outcome,
+       d.timestamp as timestamp,
+       d.request_reason as reason,
+       d.decision_reasoning as reasoning
+ORDER BY d.timestamp DESC
+LIMIT 10
+"""
 
+# Rule-based precedents, scored by ARR closeness (null filters match all)
+FIND_PRECEDENTS_CYPHER = """
+MATCH (d:Decision)
+WHERE d.type = $type
+  AND d.timestamp > datetime($since)
+  AND ($industry IS NULL OR d.customer_industry = $industry)
+  AND ($arr IS NULL OR (d.customer_arr > $arr_min AND d.customer_arr < $arr_max))
+WITH d,
+     CASE WHEN $arr IS NULL OR d.customer_arr IS NULL THEN 0.0
+          ELSE 1.0 - abs(d.customer_arr - $arr) / toFloat($arr_window)
+     END as arr_closeness
+RETURN d.id as decision_id,
+       d.customer_name as customer,
+       d.final_action as outcome,
+       d.timestamp as timestamp,
+       d.customer_arr as arr,
+       d.customer_industry as industry,
+       $base_score + (1.0 - $base_score) *
+           CASE WHEN arr_closeness < 0.0 THEN 0.0 ELSE arr_closeness END as similarity_score
+ORDER BY similarity_score DESC, d.timestamp DESC
+LIMIT $limit
+"""
 
-def _create_customer_node(tx, trace: DecisionTrace):
-    """Create Customer node (MERGE = create if not exists, update on match)."""
-    # Extract customer data from evidence
-    customer_data = {
-        "name": trace.request.customer,
-        "industry": None,
-        "current_arr": None,
-        "tier": None
-    }
-    
-    for evidence in trace.evidence:
-        if evidence.field == "industry":
-            customer_data["industry"] = evidence.value
-        elif evidence.field == "arr":
-            customer_data["current_arr"] = evidence.value
-        elif evidence.field == "tier":
-            customer_data["tier"] = evidence.value
-    
-    tx.run("""
-        MERGE (c:Customer {name: $name})
-        ON CREATE SET
-            c.industry = $industry,
-            c.current_arr = $current_arr,
-            c.tier = $tier,
-            c.first_seen = datetime(),
-            c.last_decision = datetime($timestamp)
-        ON MATCH SET
-            c.current_arr = COALESCE($current_arr, c.current_arr),
-            c.last_decision = datetime($timestamp)
-    """, {
-        "name": customer_data["name"],
-        "industry": customer_data["industry"],
-        "current_arr": customer_data["current_arr"],
-        "tier": customer_data["tier"],
-        "timestamp": trace.timestamp.isoformat()
-    })
+# Pattern analysis in one round trip: the filtered decisions are matched
+# once and shared by the stats, top approvers and exception type subqueries
+PATTERN_ANALYSIS_CYPHER = """
+MATCH (d:Decision)
+WHERE d.type = $type
+  AND ($industry IS NULL OR d.customer_industry = $industry)
+WITH collect(d) as decisions
+CALL {
+    WITH decisions
+    UNWIND decisions as d
+    RETURN count(d) as total,
+           sum(CASE WHEN d.outcome = 'approved' THEN 1 ELSE 0 END) as approved,
+           sum(CASE WHEN d.outcome = 'modified' THEN 1 ELSE 0 END) as modified
+}
+CALL {
+    WITH decisions
+    UNWIND decisions as d
+    MATCH (d)-[:APPROVED_BY]->(p:Person)
+    WITH p, count(d) as decisions_approved
+    ORDER BY decisions_approved DESC
+    LIMIT 5
+    RETURN collect({
+        approver: p.email,
+        role: p.role,
+        decisions_approved: decisions_approved
+    }) as top_approvers
+}
+CALL {
+    WITH decisions
+    UNWIND decisions as d
+    MATCH (d)-[r:OVERRODE]->(:Policy)
+    WITH r.exception_type as exception_type, count(r) as exception_count
+    ORDER BY exception_count DESC
+    RETURN collect({
+        exception_type: exception_type,
+        count: exception_count
+    }) as exceptions
+}
+RETURN total, approved, modified,
+       CASE WHEN total > 0 THEN toFloat(approved + modified) / toFloat(total) ELSE 0.0 END as approval_rate,
+       top_approvers, exceptions
+"""
 
+RECENT_DECISIONS_CYPHER = """
+MATCH (d:Decision)
+RETURN d.id as id,
+       d.customer_name as customer,
+       d.outcome as outcome,
+       d.final_action as final_action,
+       d.timestamp as timestamp,
+       d.customer_industry as industry
+ORDER BY d.timestamp DESC
+LIMIT $limit
+"""
 
-def _create_relationships(tx, trace: DecisionTrace):
-    """Create all relationships between nodes."""
-    # Decision -[:REQUESTED_BY]-> Person
-    if trace.request.requestor_email:
-        tx.run("""
-            MATCH (d:Decision {id: $decision_id})
-            MATCH (p:Person {email: $requestor_email})
-            CREATE (d)-[:REQUESTED_BY]->(p)
-        """, {
-            "decision_id": trace.decision_id,
-            "requestor_email": str(trace.request.requestor_email)
-        })
-    
-    # Decision -[:APPROVED_BY]-> Person
-    if trace.decision.decision_maker_email:
-        tx.run("""
-            MATCH (d:Decision {id: $decision_id})
-            MATCH (p:Person {email: $approver_email})
-            CREATE (d)-[:APPROVED_BY {
-                approved_at: datetime($approved_at),
-                notes: $notes
-            }]->(p)
-        """, {
-            "decision_id": trace.decision_id,
-            "approver_email": str(trace.decision.decision_maker_email),
-            "approved_at": (trace.decision.decided_at or trace.timestamp).isoformat(),
-            "notes": trace.decision.reasoning or ""
-        })
-    
-    # Decision -[:BASED_ON]-> Evidence
-    for evidence in trace.evidence:
-        evidence_id = f"evidence_{trace.decision_id}_{evidence.field}"
-        tx.run("""
-            MATCH (d:Decision {id: $decision_id})
-            MATCH (e:Evidence {id: $evidence_id})
-            CREATE (d)-[:BASED_ON]->(e)
-        """, {
-            "decision_id": trace.decision_id,
-            "evidence_id": evidence_id
-        })
+
+async def _read(query: str, params: Dict[str, Any]) -> List[Any]:
+    """
+    Run a read query in a managed read transaction.
     
-    # Decision -[:EVALUATED]-> Policy
-    if trace.policy:
-        followed = not trace.policy.exception_made
-        tx.run("""
-            MATCH (d:Decision {id: $decision_id})
-            MATCH (p:Policy {version: $version})
-            CREATE (d)-[:EVALUATED {followed: $followed}]->(p)
-        """, {
-            "decision_id": trace.decision_id,
-            "version": trace.policy.version,
-            "followed": followed
-        })
+    execute_read marks the work read-only (so a cluster can route it to
+    a follower) and retries it on transient errors.
     
-    # Decision -[:OVERRODE]-> Policy (if exceptions made)
-    if trace.policy and trace.exceptions:
-        for exception in trace.exceptions:
-            tx.run("""
-                MATCH (d:Decision {id: $decision_id})
-                MATCH (p:Policy {version: $version})
-                CREATE (d)-[:OVERRODE {
-                    exception_type: $exception_type,
-                    justification: $justification,
-                    deviation: $deviation
-                }]->(p)
-            """, {
-                "decision_id": trace.decision_id,
-                "version": trace.policy.version,
-                "exception_type": exception.exception_type,
-                "justification": exception.description,
-                "deviation": exception.deviation
-            })
-    
-    # Decision -[:FOR_CUSTOMER]-> Customer
-    tx.run("""
-        MATCH (d:Decision {id: $decision_id})
-        MATCH (c:Customer {name: $customer_name})
-        CREATE (d)-[:FOR_CUSTOMER]->(c)
-    """, {
-        "decision_id": trace.decision_id,
-        "customer_name": trace.request.customer
-    })
-
-
-def _create_similarity_relationships(tx, trace: DecisionTrace):
-    """Create SIMILAR_TO relationships to precedents if they exist."""
-    if not trace.precedents:
-        return
+    Returns:
+        The query's records
+    """
+    async def work(tx):
+        result = await tx.run(query, params)
+        return [record async for record in result]
     
-    for precedent in trace.precedents:
-        tx.run("""
-            MATCH (d1:Decision {id: $decision_id})
-            MATCH (d2:Decision {id: $precedent_id})
-            CREATE (d1)-[:SIMILAR_TO {
-                similarity_score: $similarity_score,
-                calculated_at: datetime(),
-                reason: $reason
-            }]->(d2)
-        """, {
-            "decision_id": trace.decision_id,
-            "precedent_id": precedent.decision_id,
-            "similarity_score": precedent.similarity_score,
-            "reason": precedent.why_similar or "Similar customer profile and decision context"
-        })
+    async with neo4j_service.async_session() as session:
+        return await session.execute_read(work)
 
 
-# =============================================================================
-# READ OPERATIONS
-# =============================================================================
-
 async def get_decision_by_id(decision_id: str) -> Optional[Dict]:
     """
     Get complete decision trace from graph by ID.
     
     Returns decision with all related nodes (evidence, policy, precedents).
+    Found decisions are served from an in-process LRU cache afterwards.
     """
     if not neo4j_service.is_connected():
         return None
     
-    with neo4j_service.get_session() as session:
-        result = session.run("""
-            MATCH (d:Decision {id: $decision_id})
-            OPTIONAL MATCH (d)-[:APPROVED_BY]->(approver:Person)
-            OPTIONAL MATCH (d)-[:REQUESTED_BY]->(requestor:Person)
-            OPTIONAL MATCH (d)-[:EVALUATED]->(policy:Policy)
-            OPTIONAL MATCH (d)-[:BASED_ON]->(evidence:Evidence)
-            OPTIONAL MATCH (d)-[:SIMILAR_TO]->(precedent:Decision)
-            OPTIONAL MATCH (d)-[:FOR_CUSTOMER]->(customer:Customer)
-            RETURN d, approver, requestor, policy, customer,
-                   collect(DISTINCT evidence) as evidence_list,
-                   collect(DISTINCT precedent) as precedent_list
-        """, {"decision_id": decision_id})
-        
-        record = result.single()
-        if not record:
-            return None
-        
-        # Convert Neo4j nodes to dicts
-        decision = dict(record["d"])
-        decision["approver"] = dict(record["approver"]) if record["approver"] else None
-        decision["requestor"] = dict(record["requestor"]) if record["requestor"] else None
-        decision["policy"] = dict(record["policy"]) if record["policy"] else None
-        decision["customer"] = dict(record["customer"]) if record["customer"] else None
-        decision["evidence"] = [dict(e) for e in record["evidence_list"]]
-        decision["precedents"] = [dict(p) for p in record["precedent_list"]]
-        
-        return decision
+    cached = _decision_cache.get(decision_id)
+    if cached is not None:
+        _decision_cache.move_to_end(decision_id)
+        return copy.deepcopy(cached)
+    
+    records = await _read(GET_DECISION_CYPHER, {"decision_id": decision_id})
+    if not records:
+        return None
+    record = records[0]
+    
+    # Property maps arrive as plain dicts
+    decision = record["decision"]
+    decision["approver"] = record["approver"]
+    decision["requestor"] = record["requestor"]
+    decision["policy"] = record["policy"]
+    decision["customer"] = record["customer"]
+    decision["evidence"] = record["evidence_list"]
+    decision["precedents"] = record["precedent_list"]
+    
+    _decision_cache[decision_id] = copy.deepcopy(decision)
+    while len(_decision_cache) > DECISION_CACHE_SIZE:
+        _decision_cache.popitem(last=False)
+    
+    return decision
 
 
 async def find_precedents(
@@ -427,68 +536,87 @@ async def find_precedents(
     - Similar ARR (±20%)
     - Within last 90 days
     
+    Matches are scored in Cypher by ARR closeness (PRECEDENT_BASE_SCORE
+    at the edge of the ARR window, 1.0 for identical ARR) and returned
+    best first, most recent first among equal scores. Results are cached
+    for PRECEDENT_CACHE_TTL_SECONDS (until the next save).
+    
     Args:
         customer_industry: Industry to match
         customer_arr: ARR for similarity matching
         decision_type: Type of decision (e.g., "discount_approval")
         limit: Maximum number of precedents to return
-        
+    
     Returns:
         List of Precedent objects
     """
     if not neo4j_service.is_connected():
         return []
     
-    # Build query based on available filters
-    where_clauses = ["d.type = $type"]
-    params = {"type": decision_type, "limit": limit}
-    
-    if customer_industry:
-        where_clauses.append("d.customer_industry = $industry")
-        params["industry"] = customer_industry
+    cache_key = (customer_industry or None, customer_arr or None, decision_type, limit)
+    cached = _precedent_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < PRECEDENT_CACHE_TTL_SECONDS:
+        return [precedent.model_copy() for precedent in cached[1]]
+    
+    # Absent filters are passed as null and match everything, so one
+    # query text (and cached plan) covers every filter combination
+    params = {
+        "type": decision_type,
+        "limit": limit,
+        "since": (datetime.utcnow() - timedelta(days=PRECEDENT_LOOKBACK_DAYS)).isoformat(),
+        "industry": customer_industry or None,
+        "arr": None,
+        "arr_min": None,
+        "arr_max": None,
+        "arr_window": None,
+        "base_score": PRECEDENT_BASE_SCORE
+    }
     
     if customer_arr:
-        where_clauses.append("d.customer_arr > $arr_min AND d.customer_arr < $arr_max")
-        params["arr_min"] = int(customer_arr * 0.8)
-        params["arr_max"] = int(customer_arr * 1.2)
-    
-    where_clause = " AND ".join(where_clauses)
-    
-    query = f"""
-        MATCH (d:Decision)
-        WHERE {where_clause}
-        RETURN d.id as decision_id,
-               d.customer_name as customer,
-               d.final_action as outcome,
-               d.timestamp as timestamp,
-               d.customer_arr as arr,
-               d.customer_industry as industry
-        ORDER BY d.timestamp DESC
-        LIMIT $limit
-    """
+        params["arr"] = customer_arr
+        params["arr_min"] = int(customer_arr * (1 - PRECEDENT_ARR_TOLERANCE))
+        params["arr_max"] = int(customer_arr * (1 + PRECEDENT_ARR_TOLERANCE))
+        params["arr_window"] = customer_arr * PRECEDENT_ARR_TOLERANCE
     
     try:
-        with neo4j_service.get_session() as session:
-            result = session.run(query, params)
-            
-            precedents = []
-            for record in result:
-                precedents.append(Precedent(
-                    decision_id=record["decision_id"],
-                    customer=record["customer"],
-                    outcome=record["outcome"],
-                    similarity_score=0.85,  # Simple score based on query match
-                    timestamp=record["timestamp"].to_native() if record["timestamp"] else datetime.utcnow(),
-                    why_similar=f"Same industry ({record['industry']}) and similar ARR"
-                ))
-            
-            return precedents
+        records = await _read(FIND_PRECEDENTS_CYPHER, params)
+        
+        precedents = [
+            Precedent(
+                decision_id=record["decision_id"],
+                customer=record["customer"],
+                outcome=record["outcome"],
+                similarity_score=min(record["similarity_score"], 1.0),
+                timestamp=record["timestamp"].to_native() if record["timestamp"] else datetime.utcnow(),
+                why_similar=f"Same industry ({record['industry']}) and similar ARR"
+            )
+            for record in records
+        ]
+        
+        if len(_precedent_cache) >= PRECEDENT_CACHE_SIZE:
+            _precedent_cache.clear()
+        _precedent_cache[cache_key] = (
+            time.monotonic(),
+            [precedent.model_copy() for precedent in precedents]
+        )
+        return precedents
     
     except Exception as e:
         logger.error(f"Error finding precedents: {e}")
         return []
 
 
+def _precedent_summary(candidate: Dict[str, Any]) -> str:
+    """Build the text embedded for a precedent candidate."""
+    return f"""
+Discount: {candidate.get('outcome', 'Unknown')}
+Industry: {candidate.get('industry', 'Unknown')}
+ARR: ${candidate.get('arr', 'Unknown')}
+Reason: {candidate.get('reason', '')}
+Reasoning: {candidate.get('reasoning', '')}
+"""
+
+
 async def find_semantic_precedents(
     decision_summary: str,
     customer_industry: Optional[str],
@@ -503,9 +631,9 @@ async def find_semantic_precedents(
     1. Generates decision embedding once
     2. Limits candidate search
     3. Only generates explanations for top matches
+    4. Embeds candidates in one batch, cached per decision id
     """
     from .gemini_service import gemini_service
-    import numpy as np
     
     if not neo4j_service.is_connected():
         return []
@@ -519,66 +647,49 @@ async def find_semantic_precedents(
         return await find_precedents(customer_industry, customer_arr, decision_type, limit)
     
     # Step 2: Get candidate decisions from Neo4j (Reduced limit)
-    # limit 10 instead of 20 to save embedding calls
-    with neo4j_service.get_session() as session:
-        result = session.run("""
-            MATCH (d:Decision)
-            WHERE d.type = $type
-            RETURN d.id as decision_id,
-                   d.customer_name as customer,
-                   d.customer_industry as industry,
-                   d.customer_arr as arr,
-                   d.final_action as outcome,
-                   d.timestamp as timestamp,
-                   d.request_reason as reason,
-                   d.decision_reasoning as reasoning
-            ORDER BY d.timestamp DESC
-            LIMIT 10
-        """, {"type": decision_type})
-        
-        candidates = [dict(record) for record in result]
+    candidates = [
+        dict(record)
+        for record in await _read(SEMANTIC_CANDIDATES_CYPHER, {"type": decision_type})
+    ]
     
     if not candidates:
         return []
     
-    # Step 3: Calculate semantic similarity efficiently
-    similarities = []
-    decision_vec = np.array(decision_embedding)
-    norm_decision = np.linalg.norm(decision_vec)
-    
-    for candidate in candidates:
-        # Create summary for precedent
-        precedent_summary = f"""
-Discount: {candidate.get('outcome', 'Unknown')}
-Industry: {candidate.get('industry', 'Unknown')}
-ARR: ${candidate.get('arr', 'Unknown')}
-Reason: {candidate.get('reason', '')}
-Reasoning: {candidate.get('reasoning', '')}
-"""
-        # Generate embedding for candidate (1 call per candidate)
-        precedent_embedding = await gemini_service.generate_embeddings(precedent_summary)
-        
-        if not precedent_embedding:
-            continue
-            
-        # Calculate cosine similarity locally (No extra API call)
-        precedent_vec = np.array(precedent_embedding)
-        norm_precedent = np.linalg.norm(precedent_vec)
-        
-        if norm_decision == 0 or norm_precedent == 0:
-            similarity = 0.0
-        else:
-            similarity = np.dot(decision_vec, precedent_vec) / (norm_decision * norm_precedent)
-            
-        similarities.append({
-            'candidate': candidate,
-            'similarity': float(similarity),
-            'precedent_summary': precedent_summary
-        })
+    # Step 3: Embed candidates not seen before in a single batched call
+    summaries = [_precedent_summary(candidate) for candidate in candidates]
+    missing = [
+        i for i, candidate in enumerate(candidates)
+        if candidate['decision_id'] not in _precedent_embeddings
+    ]
+    if missing:
+        new_embeddings = await gemini_service.generate_embeddings_batch(
+            [summaries[i] for i in missing]
+        )
+        for i, embedding in zip(missing, new_embeddings):
+            _precedent_embeddings.add(candidates[i]['decision_id'], embedding)
+    
+    # Step 4: Score all candidates with one matrix-vector product
+    by_id = {candidate['decision_id']: i for i, candidate in enumerate(candidates)}
+    scored_ids, scores = _precedent_embeddings.scores(decision_embedding, list(by_id))
+    if not scored_ids:
+        return []
+    embedded = [by_id[decision_id] for decision_id in scored_ids]
     
-    # Step 4: Sort by similarity and take top N
-    similarities.sort(key=lambda x: x['similarity'], reverse=True)
-    top_matches = similarities[:limit]
+    # Take the top N without fully sorting the candidates
+    if len(scores) > limit:
+        top = np.argpartition(-scores, limit)[:limit]
+    else:
+        top = np.arange(len(scores))
+    top = top[np.argsort(-scores[top])]
+    
+    top_matches = [
+        {
+            'candidate': candidates[embedded[j]],
+            'similarity': float(scores[j]),
+            'precedent_summary': summaries[embedded[j]]
+        }
+        for j in top
+    ]
     
     # Step 5: Convert to Precedent objects
     # Only explain the VERY top matches to save quota (max 2)
@@ -639,61 +750,24 @@ async def get_pattern_analysis(
     if not neo4j_service.is_connected():
         return {"error": "Neo4j not connected"}
     
-    # Build query with optional industry filter
-    where_clause = "WHERE d.type = $type"
-    params = {"type": decision_type}
-    
-    if industry:
-        where_clause += " AND d.customer_industry = $industry"
-        params["industry"] = industry
-    
-    with neo4j_service.get_session() as session:
-        # Get approval stats
-        result = session.run(f"""
-            MATCH (d:Decision)
-            {where_clause}
-            WITH count(d) as total,
-                 sum(CASE WHEN d.outcome = 'approved' THEN 1 ELSE 0 END) as approved,
-                 sum(CASE WHEN d.outcome = 'modified' THEN 1 ELSE 0 END) as modified
-            RETURN total, approved, modified,
-                   CASE WHEN total > 0 THEN toFloat(approved + modified) / toFloat(total) ELSE 0.0 END as approval_rate
-        """, params)
-        
-        stats = result.single()
-        
-        # Get top approvers
-        result = session.run(f"""
-            MATCH (d:Decision)-[:APPROVED_BY]->(p:Person)
-            {where_clause}
-            RETURN p.email as approver,
-                   p.role as role,
-                   count(d) as decisions_approved
-            ORDER BY decisions_approved DESC
-            LIMIT 5
-        """, params)
-        
-        top_approvers = [dict(record) for record in result]
-        
-        # Get exception types
-        result = session.run(f"""
-            MATCH (d:Decision)-[r:OVERRODE]->(:Policy)
-            {where_clause}
-            RETURN r.exception_type as exception_type,
-                   count(r) as count
-            ORDER BY count DESC
-        """, params)
-        
-        exceptions = [dict(record) for record in result]
-        
-        return {
-            "total_decisions": stats["total"],
-            "approved": stats["approved"],
-            "modified": stats["modified"],
-            "approval_rate": round(stats["approval_rate"], 2) if stats["approval_rate"] else 0,
-            "top_approvers": top_approvers,
-            "common_exceptions": exceptions,
-            "filter": {"industry": industry, "decision_type": decision_type}
-        }
+    records = await _read(PATTERN_ANALYSIS_CYPHER, {
+        "type": decision_type,
+        "industry": industry or None
+    })
+    
+    stats = records[0]
+    top_approvers = stats["top_approvers"]
+    exceptions = stats["exceptions"]
+    
+    return {
+        "total_decisions": stats["total"],
+        "approved": stats["approved"],
+        "modified": stats["modified"],
+        "approval_rate": round(stats["approval_rate"], 2) if stats["approval_rate"] else 0,
+        "top_approvers": top_approvers,
+        "common_exceptions": exceptions,
+        "filter": {"industry": industry, "decision_type": decision_type}
+    }
 
 
 async def list_recent_decisions(limit: int = 10) -> List[Dict]:
@@ -701,28 +775,16 @@ async def list_recent_decisions(limit: int = 10) -> List[Dict]:
     if not neo4j_service.is_connected():
         return []
     
-    with neo4j_service.get_session() as session:
-        result = session.run("""
-            MATCH (d:Decision)
-            RETURN d.id as id,
-                   d.customer_name as customer,
-                   d.outcome as outcome,
-                   d.final_action as final_action,
-                   d.timestamp as timestamp,
-                   d.customer_industry as industry
-            ORDER BY d.timestamp DESC
-            LIMIT $limit
-        """, {"limit": limit})
-        
-        decisions = []
-        for record in result:
-            decisions.append({
-                "id": record["id"],
-                "customer": record["customer"],
-                "outcome": record["outcome"],
-                "final_action": record["final_action"],
-                "timestamp": record["timestamp"].isoformat() if record["timestamp"] else None,
-                "industry": record["industry"]
-            })
-        
-        return decisions
+    records = await _read(RECENT_DECISIONS_CYPHER, {"limit": limit})
+    
+    return [
+        {
+            "id": record["id"],
+            "customer": record["customer"],
+            "outcome": record["outcome"],
+            "final_action": record["final_action"],
+            "timestamp": record["timestamp"].isoformat() if record["timestamp"] else None,
+            "industry": record["industry"]
+        }
+        for record in records
+    ]
@@ -0,0 +1,148 @@
+"""
+Local Embedder - In-Process Sentence Embeddings via ONNX Runtime
+
+Runs an ONNX export of sentence-transformers/all-MiniLM-L6-v2 (ideally
+int8 dynamically quantized) on CPU, so embedding-heavy paths (extraction
+cache lookups, precedent ranking) avoid a network round-trip per call.
+
+Enabled with EMBEDDING_BACKEND=local. Requires the optional `onnxruntime`
+and `tokenizers` packages plus the exported model and tokenizer files.
+"""
+import os
+import logging
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# CONFIGURATION
+# =============================================================================
+
+LOCAL_EMBEDDING_MODEL_PATH = os.getenv("LOCAL_EMBEDDING_MODEL_PATH", "minilm-int8.onnx")
+LOCAL_EMBEDDING_TOKENIZER_PATH = os.getenv("LOCAL_EMBEDDING_TOKENIZER_PATH", "tokenizer.json")
+
+# MiniLM was trained on sequences up to 256 word pieces. Longer inputs
+# keep their end: in an email thread (oldest message first) that is
+# where the latest replies and the decision are.
+LOCAL_EMBEDDING_MAX_TOKENS = 256
+
+
+# =============================================================================
+# LOCAL EMBEDDER CLASS
+# =============================================================================
+
+class LocalEmbedder:
+    """
+    Lazily loaded ONNX sentence embedder.
+    
+    The session and tokenizer are loaded on first use. Inputs are
+    tokenized and encoded as one batch (truncated to their last
+    LOCAL_EMBEDDING_MAX_TOKENS word pieces), mean-pooled over the
+    attention mask and L2-normalized (384-d for MiniLM).
+    """
+    
+    def __init__(
+        self,
+        model_path: str = LOCAL_EMBEDDING_MODEL_PATH,
+        tokenizer_path: str = LOCAL_EMBEDDING_TOKENIZER_PATH
+    ):
+        """Record model locations; nothing is loaded until first use."""
+        self._model_path = model_path
+        self._tokenizer_path = tokenizer_path
+        self._session = None
+        self._tokenizer = None
+        self._input_names: List[str] = []
+        self._load_failed = False
+        self._lock = threading.Lock()
+    
+    def _load(self) -> bool:
+        """Load the ONNX session and tokenizer. Returns False if unavailable."""
+        if self._session is not None:
+            return True
+        if self._load_failed:
+            return False
+        
+        with self._lock:
+            if self._session is not None:
+                return True
+            try:
+                import onnxruntime
+                from tokenizers import Tokenizer
+                
+                tokenizer = Tokenizer.from_file(self._tokenizer_path)
+                tokenizer.enable_truncation(
+                    max_length=LOCAL_EMBEDDING_MAX_TOKENS,
+                    direction="left"
+                )
+                tokenizer.enable_padding()
+                
+                session = onnxruntime.InferenceSession(
+                    self._model_path,
+                    providers=["CPUExecutionProvider"]
+                )
+            except ImportError:
+                logger.error(
+                    "EMBEDDING_BACKEND=local requires onnxruntime and tokenizers "
+                    "(pip install onnxruntime tokenizers)"
+                )
+                self._load_failed = True
+                return False
+            except Exception as e:
+                logger.error(f"Failed to load local embedding model: {e}")
+                self._load_failed = True
+                return False
+            
+            self._tokenizer = tokenizer
+            self._input_names = [i.name for i in session.get_inputs()]
+            self._session = session
+            logger.info(f"Local embedding model loaded from {self._model_path}")
+            return True
+    
+    def is_available(self) -> bool:
+        """Check if the local model can be (or has been) loaded."""
+        return self._load()
+    
+    def embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """
+        Embed a batch of texts in one ONNX Runtime call.
+        
+        Blocking (CPU-bound); call from a worker thread in async code.
+        
+        Args:
+            texts: Texts to embed
+        
+        Returns:
+            (len(texts), dim) float32 array of unit vectors, or None if
+            the model is unavailable
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        if not self._load():
+            return None
+        
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+        
+        token_embeddings = self._session.run(None, feed)[0]
+        
+        # Mean-pool over real tokens only, then L2-normalize
+        mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+# =============================================================================
+# SINGLETON INSTANCE
+# =============================================================================
+
+local_embedder = LocalEmbedder()
@@ -17,14 +17,24 @@ Endpoints:
 import logging
 import os
 import uuid
-import json
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Optional, List
+
+try:
+    import orjson
+    
+    def _to_json(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode()
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    import json
+    
+    def _to_json(obj: Any) -> str:
+        return json.dumps(obj, default=str)
 
 from fastapi import FastAPI, HTTPException, Query, Body
 from fastapi.middleware.cors import CORSMiddleware
@@ -42,7 +52,7 @@ from .models import (
 )
 from .decision_engine import decision_engine
 from .gmail_service import gmail_service
-from .gemini_service import gemini_service
+from .gemini_service import gemini_service, strip_code_fences
 from .policy_store import get_all_policies, get_current_policy
 from .mock_apis import router as mock_api_router, get_all_customer_data
 from .neo4j_service import neo4j_service
@@ -51,7 +61,9 @@ from .graph_operations import (
     get_decision_by_id,
     get_pattern_analysis,
     list_recent_decisions,
-    find_semantic_precedents
+    find_semantic_precedents,
+    load_precedent_embeddings,
+    save_precedent_embeddings
 )
 from .gmail_monitor import gmail_monitor
 
@@ -784,6 +796,8 @@ async def startup_event():
             "LLM extraction will use fallback pattern matching."
         )
     
+    load_precedent_embeddings()
+    
     # Check Neo4j connection
     if neo4j_service.is_connected():
         stats = neo4j_service.get_stats()
@@ -799,7 +813,9 @@ async def startup_event():
 async def shutdown_event():
     """Application shutdown tasks."""
     logger.info("Context Graph Decision Engine shutting down...")
-    neo4j_service.close()
+    save_precedent_embeddings()
+    await neo4j_service.aclose()
+    await gemini_service.close()
 
 
 # =============================================================================
@@ -956,16 +972,15 @@ async def chat_with_knowledge_graph(request: dict = Body(...)) -> dict:
     cypher_query = await gemini_service.chat(query_prompt)
     
     # Clean up query
-    if cypher_query.startswith('```'):
-        cypher_query = cypher_query.split('```')[1].replace('cypher', '').strip()
+    cypher_query = strip_code_fences(cypher_query)
         
     # 2. Execute query
     records = []
     if neo4j_service.is_connected():
         try:
-            with neo4j_service.get_session() as session:
-                result = session.run(cypher_query)
-                records = [dict(record) for record in result]
+            async with neo4j_service.async_session() as session:
+                result = await session.run(cypher_query)
+                records = [dict(record) async for record in result]
         except Exception as e:
             logger.error(f"Cypher execution failed: {e}")
             pass
@@ -974,7 +989,7 @@ async def chat_with_knowledge_graph(request: dict = Body(...)) -> dict:
     # 3. Format answer
     answer_prompt = (
         f"User asked: \"{question}\"\n"
-        f"Query results: {json.dumps(records, default=str)}\n\n"
+        f"Query results: {_to_json(records)}\n\n"
         f"Format this into a clear, natural language answer."
     )
     
@@ -5,9 +5,12 @@ Simulates external system APIs (CRM, Support, Finance) with realistic data
 for 5 test customers. All responses include `retrieved_at` timestamps
 to support temporal decision tracing.
 """
+import os
+import time
+from collections import OrderedDict
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from datetime import datetime
 
 
@@ -328,14 +331,65 @@ async def list_customers() -> Dict:
 # HELPER FUNCTIONS FOR INTERNAL USE
 # =============================================================================
 
+# Short-lived memo of get_all_customer_data, keyed by lowercased customer name.
+# Values are (expires_at monotonic seconds, result).
+CUSTOMER_DATA_TTL_SECONDS = float(os.getenv("CUSTOMER_DATA_TTL_SECONDS", "60"))
+CUSTOMER_DATA_CACHE_SIZE = 1024
+_customer_data_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+
+def _copy_customer_data(result: Dict) -> Dict:
+    """Copy a result so callers can modify it without touching the cache."""
+    return {
+        key: value.copy() if isinstance(value, dict) else value
+        for key, value in result.items()
+    }
+
+
+def invalidate_customer_data(customer_name: Optional[str] = None) -> None:
+    """
+    Drop cached enrichment data for one customer, or for all customers.
+    
+    Call when a source system reports a change for the customer.
+    """
+    if customer_name is None:
+        _customer_data_cache.clear()
+    else:
+        _customer_data_cache.pop(customer_name.strip().lower(), None)
+
+
 async def get_all_customer_data(customer_name: str) -> Dict:
     """
     Get all data for a customer from all mock systems.
     Used by decision engine for parallel data enrichment.
     
+    Results are memoized per customer for CUSTOMER_DATA_TTL_SECONDS, so
+    repeated traces for the same customer skip the source lookups.
+    `retrieved_at` keeps the time the data was actually fetched.
+    
     Returns:
         Dict with crm, support, and finance data (or None for each if not found)
     """
+    cache_key = customer_name.strip().lower()
+    now = time.monotonic()
+    
+    cached = _customer_data_cache.get(cache_key)
+    if cached is not None and cached[0] > now:
+        _customer_data_cache.move_to_end(cache_key)
+        return _copy_customer_data(cached[1])
+    
+    result = _fetch_all_customer_data(customer_name)
+    
+    _customer_data_cache[cache_key] = (now + CUSTOMER_DATA_TTL_SECONDS, result)
+    _customer_data_cache.move_to_end(cache_key)
+    while len(_customer_data_cache) > CUSTOMER_DATA_CACHE_SIZE:
+        _customer_data_cache.popitem(last=False)
+    
+    return _copy_customer_data(result)
+
+
+def _fetch_all_customer_data(customer_name: str) -> Dict:
+    """Look up a customer in every mock system (uncached)."""
     normalized = _normalize_customer_name(customer_name)
     
     result = {
@@ -349,20 +403,22 @@ async def get_all_customer_data(customer_name: str) -> Dict:
         return result
     
     result["customer_found"] = True
+    # One timestamp for all three systems, taken once per lookup
+    retrieved_at = datetime.utcnow()
     
     if normalized in MOCK_CRM_DATA:
         data = MOCK_CRM_DATA[normalized].copy()
-        data["retrieved_at"] = datetime.utcnow()
+        data["retrieved_at"] = retrieved_at
         result["crm"] = data
     
     if normalized in MOCK_SUPPORT_DATA:
         data = MOCK_SUPPORT_DATA[normalized].copy()
-        data["retrieved_at"] = datetime.utcnow()
+        data["retrieved_at"] = retrieved_at
         result["support"] = data
     
     if normalized in MOCK_FINANCE_DATA:
         data = MOCK_FINANCE_DATA[normalized].copy()
-        data["retrieved_at"] = datetime.utcnow()
+        data["retrieved_at"] = retrieved_at
         result["finance"] = data
     
     return result
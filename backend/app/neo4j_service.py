@@ -2,17 +2,27 @@
 Neo4j Service - Graph Database Connection Layer
 
 Manages Neo4j connection lifecycle, schema creation, and health checks.
-Provides session context management for graph operations.
+Provides session context management for graph operations: async sessions
+for the request path, sync sessions for startup, health and stats.
 """
 import os
 import logging
 from typing import Optional
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
-from neo4j import GraphDatabase, Driver
+from neo4j import GraphDatabase, Driver, AsyncGraphDatabase, AsyncDriver
 
 logger = logging.getLogger(__name__)
 
+# Database every session is bound to (skips the home-database lookup)
+NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# Connection pool sizing for the process-wide driver
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(
+    os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60")
+)
+
 
 class Neo4jService:
     """
@@ -31,6 +41,8 @@ class Neo4jService:
         self.password = os.getenv("NEO4J_PASSWORD", "")
         
         self.driver: Optional[Driver] = None
+        # Async driver for graph operations, so queries don't block the event loop
+        self.async_driver: Optional[AsyncDriver] = None
         self._connected = False
         
         # Try to connect
@@ -45,13 +57,23 @@ class Neo4jService:
         try:
             self.driver = GraphDatabase.driver(
                 self.uri,
-                auth=(self.user, self.password)
+                auth=(self.user, self.password),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT
             )
             # Verify connection
             self.driver.verify_connectivity()
             self._connected = True
             logger.info(f"Neo4j connection established: {self.uri}")
             
+            # Connects lazily, on the event loop that first uses it
+            self.async_driver = AsyncGraphDatabase.driver(
+                self.uri,
+                auth=(self.user, self.password),
+                max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=NEO4J_CONNECTION_ACQUISITION_TIMEOUT
+            )
+            
             # Create schema on successful connection
             self._create_schema()
             
@@ -60,10 +82,13 @@ class Neo4jService:
             self._connected = False
     
     @contextmanager
-    def get_session(self):
+    def get_session(self, database: Optional[str] = None):
         """
         Context manager for Neo4j sessions.
         
+        Sessions come from the one pooled driver and are bound to
+        NEO4J_DATABASE unless another database is given.
+        
         Usage:
             with neo4j_service.get_session() as session:
                 session.run("MATCH (n) RETURN n LIMIT 10")
@@ -71,12 +96,30 @@ class Neo4jService:
         if not self.driver:
             raise ConnectionError("Neo4j driver not initialized")
         
-        session = self.driver.session()
+        session = self.driver.session(database=database or NEO4J_DATABASE)
         try:
             yield session
         finally:
             session.close()
     
+    @asynccontextmanager
+    async def async_session(self, database: Optional[str] = None):
+        """
+        Async context manager for Neo4j sessions.
+        
+        Usage:
+            async with neo4j_service.async_session() as session:
+                result = await session.run("MATCH (n) RETURN n LIMIT 10")
+        """
+        if not self.async_driver:
+            raise ConnectionError("Neo4j driver not initialized")
+        
+        session = self.async_driver.session(database=database or NEO4J_DATABASE)
+        try:
+            yield session
+        finally:
+            await session.close()
+    
     def _create_schema(self):
         """
         Create constraints and indexes for the graph schema.
@@ -109,6 +152,8 @@ class Neo4jService:
             indexes = [
                 "CREATE INDEX decision_timestamp IF NOT EXISTS FOR (d:Decision) ON (d.timestamp)",
                 "CREATE INDEX decision_type IF NOT EXISTS FOR (d:Decision) ON (d.type)",
+                # Type filter + recency ordering (precedent search, recent decisions)
+                "CREATE INDEX decision_type_timestamp IF NOT EXISTS FOR (d:Decision) ON (d.type, d.timestamp)",
                 "CREATE INDEX decision_customer IF NOT EXISTS FOR (d:Decision) ON (d.customer_name)",
                 "CREATE INDEX decision_industry IF NOT EXISTS FOR (d:Decision) ON (d.customer_industry)",
                 "CREATE INDEX decision_outcome IF NOT EXISTS FOR (d:Decision) ON (d.outcome)",
@@ -171,11 +216,18 @@ class Neo4jService:
         return self._connected
     
     def close(self):
-        """Close Neo4j connection gracefully."""
+        """Close the sync Neo4j connection (scripts without an event loop)."""
         if self.driver:
             self.driver.close()
             self._connected = False
             logger.info("Neo4j connection closed")
+    
+    async def aclose(self):
+        """Close both Neo4j drivers gracefully."""
+        if self.async_driver:
+            await self.async_driver.close()
+            self.async_driver = None
+        self.close()
 
 
 # =============================================================================
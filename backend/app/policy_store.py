@@ -7,6 +7,7 @@ Manages business policies with version history, enabling queries like:
 This is critical for decision tracing - we need to know which rules
 were in effect at the exact moment a decision was made.
 """
+from bisect import bisect_right
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
@@ -98,8 +99,31 @@ class PolicyStore:
     def __init__(self):
         """Initialize with pre-defined policy versions."""
         self._policies = POLICY_VERSIONS
+        self._rebuild_index()
         logger.info(f"PolicyStore initialized with {len(self._policies)} versions")
     
+    def _rebuild_index(self) -> None:
+        """
+        Rebuild the interval index used by get_policy_at_time.
+        
+        Policies are kept sorted by effective_from so a lookup is a
+        single bisect plus an effective_until check.
+        """
+        self._policies = sorted(self._policies, key=lambda p: p["effective_from"])
+        self._sorted_starts: List[datetime] = [p["effective_from"] for p in self._policies]
+    
+    def upsert_policy(self, policy: Dict[str, Any]) -> None:
+        """
+        Add a policy version, or replace an existing one with the same version.
+        
+        Args:
+            policy: Policy dict with version, effective_from, effective_until and rules
+        """
+        self._policies = [p for p in self._policies if p["version"] != policy["version"]]
+        self._policies.append(policy)
+        self._rebuild_index()
+        logger.info(f"Policy version {policy['version']} upserted")
+    
     def get_policy_at_time(self, timestamp: datetime) -> Optional[Dict[str, Any]]:
         """
         Get the policy version that was active at a specific timestamp.
@@ -114,14 +138,15 @@ class PolicyStore:
             Policy dict with version, effective dates, and rules.
             Returns None if no policy was active at that time.
         """
-        for policy in self._policies:
-            effective_from = policy["effective_from"]
+        # Latest policy that started at or before the timestamp
+        idx = bisect_right(self._sorted_starts, timestamp) - 1
+        if idx >= 0:
+            policy = self._policies[idx]
             effective_until = policy["effective_until"]
             
             # Check if timestamp falls within this policy's effective period
-            if timestamp >= effective_from:
-                if effective_until is None or timestamp <= effective_until:
-                    return policy.copy()
+            if effective_until is None or timestamp <= effective_until:
+                return policy.copy()
         
         # No policy found for this timestamp
         logger.warning(f"No policy found for timestamp {timestamp}")
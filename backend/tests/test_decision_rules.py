@@ -0,0 +1,113 @@
+"""
+Tests for app.decision_rules - discount parsing, evidence building and
+policy exception tiers.
+
+Run from backend/: python -m unittest discover -s tests -t .
+"""
+import unittest
+from datetime import datetime
+
+from app.decision_rules import build_evidence, detect_policy_exceptions, parse_discount
+
+
+POLICY = {
+    "rules": {
+        "discount_limits": {
+            "standard_limit": 10,
+            "manager_limit": 15,
+            "vp_limit": 20
+        }
+    }
+}
+
+
+class ParseDiscountTest(unittest.TestCase):
+
+    def test_parses_percent_strings(self):
+        self.assertEqual(parse_discount("15%"), 15.0)
+        self.assertEqual(parse_discount("15 %"), 15.0)
+        self.assertEqual(parse_discount("12.5"), 12.5)
+        self.assertEqual(parse_discount("approved 18% discount"), 18.0)
+
+    def test_unparseable_is_none(self):
+        self.assertIsNone(parse_discount(None))
+        self.assertIsNone(parse_discount("no discount"))
+        self.assertIsNone(parse_discount(15))
+
+
+class DetectPolicyExceptionsTest(unittest.TestCase):
+
+    def assertTier(self, discount, exception_type, limit):
+        exceptions = detect_policy_exceptions(discount, POLICY)
+        self.assertEqual(len(exceptions), 1)
+        self.assertEqual(exceptions[0].exception_type, exception_type)
+        self.assertEqual(exceptions[0].policy_limit, f"{limit}%")
+
+    def test_at_standard_limit_is_no_exception(self):
+        self.assertEqual(detect_policy_exceptions("10%", POLICY), [])
+        self.assertEqual(detect_policy_exceptions("5%", POLICY), [])
+
+    def test_just_above_standard_limit(self):
+        self.assertTier("10.5%", "exceeds_standard_limit", 10)
+
+    def test_at_manager_limit(self):
+        self.assertTier("15%", "exceeds_standard_limit", 10)
+
+    def test_just_above_manager_limit(self):
+        self.assertTier("15.5%", "requires_vp_approval", 15)
+
+    def test_at_vp_limit(self):
+        self.assertTier("20%", "requires_vp_approval", 15)
+
+    def test_just_above_vp_limit(self):
+        self.assertTier("20.5%", "exceeds_all_standard_limits", 20)
+        exception = detect_policy_exceptions("25%", POLICY)[0]
+        self.assertEqual(exception.deviation, "5.0%")
+        self.assertEqual(exception.approved_by, "Executive exception required")
+
+    def test_default_limits_when_policy_has_none(self):
+        self.assertEqual(detect_policy_exceptions("10%", {"rules": {}}), [])
+        self.assertEqual(
+            detect_policy_exceptions("16%", {"rules": {}})[0].exception_type,
+            "requires_vp_approval"
+        )
+
+    def test_missing_inputs(self):
+        self.assertEqual(detect_policy_exceptions(None, POLICY), [])
+        self.assertEqual(detect_policy_exceptions("25%", None), [])
+        self.assertEqual(detect_policy_exceptions("unknown", POLICY), [])
+
+
+class BuildEvidenceTest(unittest.TestCase):
+
+    def test_captures_fields_per_section(self):
+        decided_at = datetime(2024, 1, 15)
+        retrieved_at = datetime(2024, 1, 14)
+        evidence = build_evidence(
+            {
+                "crm": {"arr": 500000, "tier": "Enterprise", "industry": "Healthcare",
+                        "retrieved_at": retrieved_at},
+                "support": {"sev1_tickets": 2, "satisfaction_score": 4.5}
+            },
+            decided_at
+        )
+
+        self.assertEqual(
+            [(e.source, e.field, e.value) for e in evidence],
+            [
+                ("salesforce", "arr", 500000),
+                ("salesforce", "tier", "Enterprise"),
+                ("salesforce", "industry", "Healthcare"),
+                ("zendesk", "sev1_tickets", 2),
+                ("zendesk", "satisfaction_score", 4.5)
+            ]
+        )
+        self.assertEqual(evidence[0].captured_at, retrieved_at)
+        self.assertEqual(evidence[3].captured_at, decided_at)
+
+    def test_no_customer_data(self):
+        self.assertEqual(build_evidence({}, datetime(2024, 1, 15)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""
+Tests for app.embedding_store - int8 store add/remove/grow and .npz
+save/load.
+
+Run from backend/: python -m unittest discover -s tests -t .
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from app.embedding_store import EmbeddingStore
+
+
+def _vector(seed, dim=8):
+    return np.random.default_rng(seed).standard_normal(dim).tolist()
+
+
+class EmbeddingStoreTest(unittest.TestCase):
+
+    def assertScores(self, store, query, expected_ids):
+        ids, scores = store.scores(query)
+        self.assertEqual(sorted(ids), sorted(expected_ids))
+        return dict(zip(ids, scores))
+
+    def test_add_and_score(self):
+        store = EmbeddingStore()
+        self.assertTrue(store.add("a", _vector(1)))
+        self.assertTrue(store.add("b", _vector(2)))
+
+        scores = self.assertScores(store, _vector(1), ["a", "b"])
+        self.assertAlmostEqual(float(scores["a"]), 1.0, delta=0.02)
+        self.assertLess(scores["b"], scores["a"])
+        self.assertIn("a", store)
+        self.assertEqual(len(store), 2)
+
+    def test_empty_or_zero_embedding_is_rejected(self):
+        store = EmbeddingStore()
+        self.assertFalse(store.add("a", []))
+        self.assertFalse(store.add("a", [0.0, 0.0]))
+        self.assertEqual(len(store), 0)
+
+    def test_replace_keeps_one_row(self):
+        store = EmbeddingStore()
+        store.add("a", _vector(1))
+        store.add("a", _vector(2))
+
+        scores = self.assertScores(store, _vector(2), ["a"])
+        self.assertAlmostEqual(float(scores["a"]), 1.0, delta=0.02)
+
+    def test_remove_moves_last_row_into_slot(self):
+        store = EmbeddingStore()
+        for i in range(4):
+            store.add(f"id{i}", _vector(i))
+
+        store.remove("id1")
+        store.remove("missing")
+
+        self.assertEqual(len(store), 3)
+        self.assertNotIn("id1", store)
+        # id3 now lives in id1's old row and still scores as itself
+        scores = self.assertScores(store, _vector(3), ["id0", "id2", "id3"])
+        self.assertAlmostEqual(float(scores["id3"]), 1.0, delta=0.02)
+        ids, _ = store.scores(_vector(0), ids=["id0", "id1"])
+        self.assertEqual(ids, ["id0"])
+
+    def test_grows_past_initial_capacity(self):
+        store = EmbeddingStore(initial_capacity=2)
+        for i in range(9):
+            store.add(f"id{i}", _vector(i))
+
+        self.assertEqual(len(store), 9)
+        for i in range(9):
+            scores = self.assertScores(store, _vector(i), [f"id{j}" for j in range(9)])
+            self.assertAlmostEqual(float(scores[f"id{i}"]), 1.0, delta=0.02)
+
+    def test_evicts_oldest_beyond_max_size(self):
+        store = EmbeddingStore(max_size=3, initial_capacity=2)
+        for i in range(5):
+            store.add(f"id{i}", _vector(i))
+
+        self.assertEqual(len(store), 3)
+        self.assertScores(store, _vector(0), ["id2", "id3", "id4"])
+
+    def test_dimension_change_on_add_clears_store(self):
+        store = EmbeddingStore()
+        store.add("a", _vector(1, dim=8))
+        store.add("b", _vector(2, dim=4))
+
+        self.assertEqual(len(store), 1)
+        self.assertScores(store, _vector(2, dim=4), ["b"])
+        self.assertEqual(store.scores(_vector(1, dim=8))[0], [])
+
+    def test_save_load_round_trip(self):
+        store = EmbeddingStore()
+        for i in range(5):
+            store.add(f"id{i}", _vector(i))
+        store.remove("id1")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "store.npz")
+            store.save(path)
+            loaded = EmbeddingStore(max_size=3)
+            self.assertEqual(loaded.load(path), 3)
+
+        # Oldest first on save, so max_size keeps the newest
+        self.assertEqual(len(loaded), 3)
+        ids, scores = loaded.scores(_vector(4))
+        _, original = store.scores(_vector(4), ids=ids)
+        np.testing.assert_allclose(scores, original)
+        self.assertEqual(sorted(ids), ["id2", "id3", "id4"])
+
+        # Loaded stores keep growing and evicting normally
+        loaded.add("id5", _vector(5))
+        self.assertScores(loaded, _vector(5), ["id3", "id4", "id5"])
+
+    def test_save_load_empty(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "store.npz")
+            EmbeddingStore().save(path)
+            self.assertEqual(EmbeddingStore().load(path), 0)
+            self.assertEqual(EmbeddingStore().load(os.path.join(tmp, "missing.npz")), 0)
+
+    def test_load_with_dimension_mismatch(self):
+        saved = EmbeddingStore()
+        saved.add("old", _vector(1, dim=4))
+        store = EmbeddingStore()
+        store.add("current", _vector(2, dim=8))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "store.npz")
+            saved.save(path)
+            self.assertEqual(store.load(path), 1)
+
+        # The file's vectors replace the store; queries of the old
+        # dimension score nothing instead of failing
+        self.assertNotIn("current", store)
+        self.assertEqual(store.scores(_vector(2, dim=8))[0], [])
+        self.assertScores(store, _vector(1, dim=4), ["old"])
+
+        # Adding the old dimension again starts over at that dimension
+        store.add("current", _vector(2, dim=8))
+        self.assertEqual(len(store), 1)
+        self.assertScores(store, _vector(2, dim=8), ["current"])
+
+
+if __name__ == "__main__":
+    unittest.main()